@@ -2,8 +2,13 @@ import streamlit as st
 import requests
 import json
 from datetime import datetime
+import os
 import time
-import re
+
+from lead_delivery import (
+    DELIVERED, FAILED, REJECTED, RETRYING, CircuitBreaker, WebhookDispatcher, http_session, post_batch, post_json
+)
+from lead_validation import normalize_email, normalize_phone, phone_hint
 
 # Page configuration
 st.set_page_config(
@@ -171,30 +176,135 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # N8N Webhook Configuration
-N8N_WEBHOOK_URL = "https://agentonline-u29564.vm.elestio.app/webhook/ac88f088-256b-4167-9e6f-c22515b2e0ed"  # Replace with your actual webhook URL
-
-def validate_email(email):
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
-
-def validate_phone(phone):
-    # Basic phone validation - adjust regex based on your requirements
-    pattern = r'^\+?[1-9]\d{1,14}$'
-    return re.match(pattern, phone.replace(' ', '').replace('-', '')) is not None
-
-def send_to_n8n(data):
+N8N_WEBHOOK_URL = os.environ.get(
+    "N8N_WEBHOOK_URL", "https://agentonline-u29564.vm.elestio.app/webhook/ac88f088-256b-4167-9e6f-c22515b2e0ed"
+)  # Replace with your actual webhook URL
+# Leads are saved to this outbox first, then sent in the background by WEBHOOK_WORKERS workers
+LEAD_OUTBOX = os.environ.get(
+    "LEAD_OUTBOX", os.path.join(os.path.dirname(os.path.abspath(__file__)), "leads_outbox.db")
+)
+WEBHOOK_WORKERS = 8
+# Keep-alive connections to the webhook host, shared by the workers
+WEBHOOK_POOL_SIZE = int(os.environ.get("WEBHOOK_POOL_SIZE", WEBHOOK_WORKERS))
+WEBHOOK_CONNECT_TIMEOUT = float(os.environ.get("WEBHOOK_CONNECT_TIMEOUT", 3.05))
+# Upper bound; the read timeout adapts to the webhook's recent p99 latency below it
+WEBHOOK_READ_TIMEOUT = float(os.environ.get("WEBHOOK_READ_TIMEOUT", 10))
+# Stop sending after this many failures in a row, and probe the webhook again after WEBHOOK_BREAKER_RESET seconds
+WEBHOOK_BREAKER_FAILURES = int(os.environ.get("WEBHOOK_BREAKER_FAILURES", 5))
+WEBHOOK_BREAKER_RESET = float(os.environ.get("WEBHOOK_BREAKER_RESET", 30))
+# Gzip request bodies (the receiving end must accept Content-Encoding: gzip)
+WEBHOOK_GZIP = os.environ.get("WEBHOOK_GZIP", "0") == "1"
+# Send up to WEBHOOK_BATCH_SIZE leads per request, waiting at most WEBHOOK_BATCH_MS to fill a batch.
+# Off (1) by default: the workflow has to accept an array of leads and answer with a result per lead.
+WEBHOOK_BATCH_SIZE = int(os.environ.get("WEBHOOK_BATCH_SIZE", 1))
+WEBHOOK_BATCH_MS = float(os.environ.get("WEBHOOK_BATCH_MS", 200))
+WEBHOOK_BATCH_URL = os.environ.get("WEBHOOK_BATCH_URL", N8N_WEBHOOK_URL)
+
+@st.cache_resource
+def get_http_session(pool_size):
+    """One pooled keep-alive HTTP client per server process, so leads reuse connections and TLS sessions"""
+    return http_session(pool_size)
+
+webhook_session = get_http_session(WEBHOOK_POOL_SIZE)
+
+@st.cache_resource
+def get_circuit_breaker():
+    """One circuit breaker per server process, so every visitor's lead sees the webhook's health"""
+    return CircuitBreaker(
+        failure_threshold=WEBHOOK_BREAKER_FAILURES,
+        reset_timeout=WEBHOOK_BREAKER_RESET,
+        max_timeout=WEBHOOK_READ_TIMEOUT,
+    )
+
+webhook_breaker = get_circuit_breaker()
+
+def send_to_n8n(data, idempotency_key=None):
     """Send form data to n8n webhook"""
+    headers = {}
+    if idempotency_key:
+        # Retries of the same lead carry the same key, so the workflow can drop duplicates
+        headers['Idempotency-Key'] = idempotency_key
     try:
-        response = requests.post(
+        response = post_json(
+            webhook_session,
             N8N_WEBHOOK_URL,
-            json=data,
-            headers={'Content-Type': 'application/json'},
-            timeout=10
+            data,
+            connect_timeout=WEBHOOK_CONNECT_TIMEOUT,
+            read_timeout=webhook_breaker.read_timeout(),
+            compress=WEBHOOK_GZIP,
+            headers=headers,
         )
         return response.status_code == 200, response
     except requests.exceptions.RequestException as e:
         return False, str(e)
 
+def send_batch_to_n8n(items):
+    """Send several (idempotency key, form data) leads to n8n in one request"""
+    try:
+        return post_batch(
+            webhook_session,
+            WEBHOOK_BATCH_URL,
+            items,
+            connect_timeout=WEBHOOK_CONNECT_TIMEOUT,
+            read_timeout=webhook_breaker.read_timeout(),
+            compress=WEBHOOK_GZIP,
+        )
+    except requests.exceptions.RequestException as e:
+        return [(False, str(e))] * len(items)
+
+@st.cache_resource
+def get_dispatcher():
+    """One outbox and delivery worker pool per server process, shared by all visitors"""
+    return WebhookDispatcher(
+        send_to_n8n,
+        LEAD_OUTBOX,
+        workers=WEBHOOK_WORKERS,
+        send_batch=send_batch_to_n8n,
+        batch_size=WEBHOOK_BATCH_SIZE,
+        batch_wait=WEBHOOK_BATCH_MS / 1000,
+        breaker=webhook_breaker,
+    )
+
+dispatcher = get_dispatcher()
+
+def render_delivery_status():
+    """Show how this visitor's latest submission is doing"""
+    delivery = dispatcher.status(st.session_state.get('delivery_id', ''))
+    if delivery is None:
+        return
+    if delivery.status == DELIVERED:
+        st.markdown("""
+        <div class="success-message">
+            ✅ <strong>Thank you!</strong> Your information has been sent successfully. 
+            Our team will contact you within 24 hours to help you get started with Bundle Pay.
+        </div>
+        """, unsafe_allow_html=True)
+    elif delivery.status == RETRYING:
+        # The lead is saved in the outbox and will be retried; don't ask for a resubmission
+        st.markdown("""
+        <div class="success-message">
+            ✅ <strong>Thank you!</strong> We've received your information and are passing it to our team. 
+            You don't need to submit it again; we'll contact you within 24 hours.
+        </div>
+        """, unsafe_allow_html=True)
+    elif delivery.status in (FAILED, REJECTED):
+        st.markdown(f"""
+        <div class="error-message">
+            ❌ <strong>Oops!</strong> There was an error sending your information. 
+            Please try again or contact us directly at support@bundlepay.com
+        </div>
+        """, unsafe_allow_html=True)
+
+        # Show technical error in expander for debugging
+        with st.expander("Technical Details"):
+            st.error(f"Error: {delivery.error}")
+    else:
+        st.info("📨 Sending your information to our team…")
+    if not delivery.pending and st.session_state.get('delivery_polling'):
+        # Stop polling: the next full run draws this without a timer
+        st.session_state.delivery_polling = False
+        st.rerun()
+
 # Header Section
 st.markdown("""
 <div class="hero-section">
@@ -316,7 +426,7 @@ with st.container():
         
         with col2:
             last_name = st.text_input("Last Name *", placeholder="Enter your last name")
-            phone = st.text_input("Phone Number *", placeholder="+1234567890")
+            phone = st.text_input("Phone Number *", placeholder="+1 415 555 0123")
             transfer_purpose = st.selectbox("Primary Transfer Purpose *", [
                 "", "Family Support", "Business Payments", "Education Fees", 
                 "Medical Expenses", "Investment", "Other"
@@ -346,11 +456,14 @@ with st.container():
             if not last_name or not last_name.strip():
                 errors.append("Last name is required")
             
-            if not email or not validate_email(email):
+            # Same rules as the bulk clean-up of exported leads (lead_validation.py)
+            normalized_email = normalize_email(email)
+            if not normalized_email:
                 errors.append("Please enter a valid email address")
             
-            if not phone or not validate_phone(phone):
-                errors.append("Please enter a valid phone number")
+            normalized_phone = normalize_phone(phone, country)
+            if not normalized_phone:
+                errors.append(f"Please enter a valid phone number {phone_hint(country)}")
             
             if not country:
                 errors.append("Please select your country")
@@ -372,8 +485,8 @@ with st.container():
                     "personal_info": {
                         "first_name": first_name.strip(),
                         "last_name": last_name.strip(),
-                        "email": email.strip().lower(),
-                        "phone": phone.strip(),
+                        "email": normalized_email,
+                        "phone": normalized_phone,
                         "country": country
                     },
                     "transfer_info": {
@@ -390,32 +503,22 @@ with st.container():
                     "lead_score": 75 if monthly_volume in ["$2,000 - $10,000", "$10,000 - $50,000", "Over $50,000"] else 50
                 }
                 
-                # Show loading spinner
-                with st.spinner("Sending your information..."):
-                    success, response = send_to_n8n(form_data)
-                
-                if success:
-                    st.markdown("""
-                    <div class="success-message">
-                        ✅ <strong>Thank you!</strong> Your information has been sent successfully. 
-                        Our team will contact you within 24 hours to help you get started with Bundle Pay.
-                    </div>
-                    """, unsafe_allow_html=True)
+                # Hand the lead to the background workers; the status below updates as it goes out
+                delivery = dispatcher.submit(form_data)
+                st.session_state.delivery_id = delivery.id
+                if delivery.status != REJECTED:
                     st.balloons()
-                else:
-                    st.markdown(f"""
-                    <div class="error-message">
-                        ❌ <strong>Oops!</strong> There was an error sending your information. 
-                        Please try again or contact us directly at support@bundlepay.com
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Show technical error in expander for debugging
-                    with st.expander("Technical Details"):
-                        st.error(f"Error: {response}")
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+    # Poll once a second while the latest submission is still on its way
+    latest = dispatcher.status(st.session_state.get('delivery_id', ''))
+    st.session_state.delivery_polling = latest is not None and latest.pending
+    if st.session_state.delivery_polling:
+        st.fragment(run_every=1)(render_delivery_status)()
+    else:
+        render_delivery_status()
+
 # How It Works Section
 st.markdown("## How Bundle Pay Works")
 
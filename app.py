@@ -1,6 +1,72 @@
 import streamlit as st
 from datetime import datetime, timedelta
-import json
+import heapq
+import os
+import time
+import uuid
+
+from checklist_core import (
+    EXPORT_FORMATS,
+    BitsetState,
+    DependencyGraph,
+    History,
+    ProgressFileError,
+    ProgressIndex,
+    Schedule,
+    SearchIndex,
+    compact_savings,
+    diff_import,
+    iter_progress_file,
+    load_registry,
+    open_progress_file,
+    serialize_progress,
+    state_memory,
+)
+from checklist_profile import NULL_PROFILER, RerunProfiler
+from checklist_sessions import SessionHandle, SessionManager
+from checklist_store import open_store
+from checklist_sync import SyncBus
+from revenue_model import PERCENTILES, RevenueInputs, probability_above, simulate_arr
+
+SCHEMA_PATH = os.environ.get(
+    "CHECKLIST_SCHEMA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "checklist.json")
+)
+# Only render the widgets of the active tab (set CHECKLIST_LAZY_TABS=0 to render every tab)
+LAZY_TABS = os.environ.get("CHECKLIST_LAZY_TABS", "1") != "0"
+# Keep each session's progress as a bitmask instead of a key -> bool dict
+COMPACT_STATE = os.environ.get("CHECKLIST_COMPACT_STATE", "0") == "1"
+# Progress backend: "sqlite" (default), "memory", or "none" to keep progress in the session only
+STORE_BACKEND = os.environ.get("CHECKLIST_STORE", "sqlite")
+STORE_PATH = os.environ.get(
+    "CHECKLIST_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "checklist.db")
+)
+# Limits for uploaded progress files
+IMPORT_MAX_BYTES = int(os.environ.get("CHECKLIST_IMPORT_MAX_BYTES", 1_000_000))
+IMPORT_MAX_KEYS = int(os.environ.get("CHECKLIST_IMPORT_MAX_KEYS", 10_000))
+# Sections longer than this render one page of checkboxes at a time
+PAGE_SIZE = int(os.environ.get("CHECKLIST_PAGE_SIZE", 50))
+# Maximum number of search results shown
+SEARCH_LIMIT = 50
+# Maximum number of tasks drawn in the plan's Gantt chart
+PLAN_ROWS = 40
+# Revenue simulations kept in the cache; each entry is a few KB of summary statistics
+REVENUE_CACHE_ENTRIES = int(os.environ.get("CHECKLIST_REVENUE_CACHE", 128))
+# Shared checklists: sessions on the same checklist push item diffs to each other
+# (CHECKLIST_SHARED=1 or ?shared=1); each session checks for them every SYNC_INTERVAL seconds
+SHARED_ENV = os.environ.get("CHECKLIST_SHARED", "0") == "1"
+SYNC_INTERVAL = float(os.environ.get("CHECKLIST_SYNC_INTERVAL", 2))
+# Sessions idle this many seconds hand their progress back to the store and reload it on return
+SESSION_TTL = float(os.environ.get("CHECKLIST_SESSION_TTL", 1800))
+# Most sessions kept in memory at once (0 for no limit); the least recently used are spilled first
+MAX_LIVE_SESSIONS = int(os.environ.get("CHECKLIST_MAX_LIVE_SESSIONS", 0))
+# Rerun profiling, enabled with CHECKLIST_PROFILE=1; visitors can only turn it on with ?profile=1
+# when CHECKLIST_PROFILE_QUERY=1, since every profiled rerun is appended to the trace file
+PROFILE_QUERY = os.environ.get("CHECKLIST_PROFILE_QUERY", "0") == "1"
+PROFILE_TRACE = os.environ.get(
+    "CHECKLIST_PROFILE_TRACE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "checklist_profile.jsonl")
+)
+# The trace file is rotated to <trace>.1 once it reaches this size
+PROFILE_TRACE_MAX_BYTES = int(os.environ.get("CHECKLIST_PROFILE_TRACE_MAX_BYTES", 10_000_000))
 
 # Page config
 st.set_page_config(
@@ -9,17 +75,187 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize session state for checklist items
-if 'checklist_state' not in st.session_state:
-    st.session_state.checklist_state = {}
+if os.environ.get("CHECKLIST_PROFILE") == "1" or (PROFILE_QUERY and st.query_params.get("profile") == "1"):
+    profiler = st.session_state.setdefault("profiler", RerunProfiler(PROFILE_TRACE, trace_max_bytes=PROFILE_TRACE_MAX_BYTES))
+else:
+    profiler = NULL_PROFILER
+# Fragment reruns see the value left by the end of the last full run
+in_full_run = True
+profiler.begin("full")
+
+@st.cache_resource
+def get_registry(path):
+    """Load and compile the checklist schema once per process"""
+    return load_registry(path)
+
+registry = get_registry(SCHEMA_PATH)
+
+@st.cache_resource
+def get_dependency_graph(path):
+    """Build the task dependency graph once per process"""
+    return DependencyGraph(get_registry(path))
+
+@st.cache_resource
+def get_store(backend, path, _registry):
+    """Open the progress store once per process; None when persistence is disabled"""
+    if backend == "none":
+        return None
+    store = open_store(backend, path)
+    store.sync_tasks(_registry)
+    return store
+
+store = get_store(STORE_BACKEND, STORE_PATH, registry)
+
+# ?tenant=acme&project=alpha selects a project checklist shared by the tenant;
+# otherwise the checklist id lives in the URL, so a refresh restores the same progress
+tenant = st.query_params.get("tenant") if store is not None else None
+if tenant:
+    project = st.query_params.get("project", "default")
+    try:
+        checklist_id = store.project_checklist(tenant, project)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+else:
+    if "cid" not in st.query_params:
+        st.query_params["cid"] = uuid.uuid4().hex
+    checklist_id = st.query_params["cid"]
+
+@st.cache_resource
+def get_sync_bus():
+    """One pub/sub bus per process, shared by every session"""
+    return SyncBus()
+
+shared = SHARED_ENV or st.query_params.get("shared") == "1"
+
+def new_checklist_state(values=None):
+    """Create a state store in the configured representation"""
+    values = values or {}
+    return BitsetState.from_dict(registry, values) if COMPACT_STATE else dict(values)
+
+def persist(session, changes, kind="set"):
+    """Queue changed item values for the progress store and its event log, and push them to peers"""
+    if not changes:
+        return
+    save = (lambda values: store.save(checklist_id, values, kind)) if store is not None else None
+    if session["subscription"] is not None:
+        session["subscription"].publish(changes, save)
+    elif save is not None:
+        save(changes)
+
+@st.cache_resource
+def get_session_manager(ttl, max_live, can_spill):
+    """Process-wide owner of every session's checklist data"""
+    return SessionManager(ttl=ttl, max_live=max_live, can_spill=can_spill)
 
-def create_checkbox(key, label, help_text=None):
+session_manager = get_session_manager(SESSION_TTL, MAX_LIVE_SESSIONS, store is not None)
+
+def load_session():
+    """Load this session's checklist data from the store"""
+    # Subscribe before loading, so no peer change falls between the load and the subscription
+    subscription = get_sync_bus().subscribe(checklist_id) if shared else None
+    checklist_state = new_checklist_state(store.load(checklist_id) if store else None)
+    # Completed counters per section/tab/overall, updated on each toggle
+    progress_index = ProgressIndex(registry, checklist_state)
+    return {
+        "checklist_id": checklist_id,
+        # Tells widget values apart from a reload of the same checklist, see sync_widgets
+        "generation": uuid.uuid4().hex,
+        "checklist_state": checklist_state,
+        "progress_index": progress_index,
+        # Built the first time the plan is shown, see get_schedule
+        "schedule": None,
+        # Undo/redo stacks for this session; the store keeps the full event log
+        "history": History(),
+        "subscription": subscription,
+        "export_cache": {},
+    }
+
+# The session's data lives in the session manager, so idle sessions can be spilled;
+# session state only keeps the handle
+session_handle = st.session_state.setdefault("session_handle", SessionHandle())
+session_key = (checklist_id, shared, registry)
+
+def current_session():
+    """This session's checklist data, reloaded from the store if it was spilled
+
+    Functions look the data up here on each call rather than through module
+    globals: Streamlit keeps the last full run's fragments, callbacks and
+    download callables alive while the tab is open, and with them that
+    run's globals, which would pin a spilled session's data in memory.
+    """
+    return session_manager.checkout(session_handle, session_key, load_session)[0]
+
+def note_toggle(key):
+    """Checkbox callback: remember this rerun's clicks for sync_widgets"""
+    st.session_state.setdefault("toggled_keys", set()).add(key)
+    profiler.set_cause(f"toggle:{key}")
+
+def sync_widgets(session):
+    """Drop checkbox widget values that don't belong to the session's loaded data
+
+    Widget values outlive spilled data. When another checklist is loaded
+    they are all dropped; when the same checklist is reloaded only this
+    rerun's clicks are kept, so the click that woke the session is saved
+    and every other checkbox shows the stored value.
+    """
+    loaded = (session["checklist_id"], session["generation"])
+    synced = st.session_state.get("widgets_synced")
+    if synced == loaded:
+        return
+    keep = st.session_state.get("toggled_keys", ()) if synced and synced[0] == loaded[0] else ()
+    for widget_key in [k for k in st.session_state if str(k).startswith("cb_") and k[3:] not in keep]:
+        del st.session_state[widget_key]
+    st.session_state.widgets_synced = loaded
+
+def apply_remote_changes(session):
+    """Apply item diffs pushed by peers and return the changed keys
+
+    Checkboxes pick the changes up when their section next renders.
+    """
+    if session["subscription"] is None:
+        return []
+    changed = session["progress_index"].update(session["subscription"].drain())
+    for key in changed:
+        st.session_state.pop(f"cb_{key}", None)
+    return changed
+
+sync_widgets(current_session())
+apply_remote_changes(current_session())
+
+def apply_changes(session, values, kind="set"):
+    """Apply item values, log the ones that changed and make them undoable
+
+    Undo and redo are logged too, but don't push onto the undo stack.
+    """
+    progress_index = session["progress_index"]
+    changed = {}
+    for key, value in values.items():
+        previous = progress_index.get(key)
+        if progress_index.set(key, value):
+            changed[key] = (previous, bool(value))
+    if changed:
+        if kind not in ("undo", "redo"):
+            session["history"].record(changed)
+        persist(session, {key: new for key, (_, new) in changed.items()}, kind)
+    return changed
+
+def create_checkbox(session, key, label, help_text=None):
     """Create a checkbox with persistent state"""
-    if key not in st.session_state.checklist_state:
-        st.session_state.checklist_state[key] = False
-    
-    checked = st.checkbox(label, value=st.session_state.checklist_state[key], key=f"cb_{key}", help=help_text)
-    st.session_state.checklist_state[key] = checked
+    checklist_state = session["checklist_state"]
+    if key not in checklist_state:
+        checklist_state[key] = False
+    
+    checked = st.checkbox(
+        label,
+        value=checklist_state[key],
+        key=f"cb_{key}",
+        help=help_text,
+        on_change=note_toggle,
+        args=(key,),
+    )
+    profiler.count_widgets()
+    apply_changes(session, {key: checked})
     return checked
 
 def progress_bar(completed_items, total_items, phase_name):
@@ -33,347 +269,507 @@ st.markdown("### One debit → All bills paid. Track your progress from idea to
 
 # Sidebar for overall progress
 st.sidebar.title("📊 Overall Progress")
-total_completed = sum(1 for v in st.session_state.checklist_state.values() if v)
-total_items = len(st.session_state.checklist_state) if st.session_state.checklist_state else 100  # Approximate
+sidebar_slot = st.sidebar.empty()
 
-if st.session_state.checklist_state:
-    st.sidebar.progress(total_completed / len(st.session_state.checklist_state))
-    st.sidebar.write(f"**{total_completed}/{len(st.session_state.checklist_state)} tasks completed**")
+# Placeholders that section fragments refresh in place; filled at the end of a full run
+aggregate_slots = {}
 
-# Export/Import functionality
-if st.sidebar.button("📥 Export Progress"):
-    st.sidebar.download_button(
-        "Download Checklist State",
-        data=json.dumps(st.session_state.checklist_state, indent=2),
-        file_name=f"billpay_progress_{datetime.now().strftime('%Y%m%d')}.json",
-        mime="application/json"
+def render_sidebar_progress(progress_index):
+    """Display overall and per-tab progress in the sidebar"""
+    total_completed, total_items = progress_index.overall()
+    with aggregate_slots["sidebar"].container():
+        st.progress(total_completed / total_items if total_items else 0)
+        st.write(f"**{total_completed}/{total_items} tasks completed**")
+        for tab in registry.tabs:
+            completed, total = progress_index.tab(tab.id)
+            st.caption(f"{tab.label}: {completed}/{total}")
+
+def render_summary(progress_index):
+    """Display the Quick Summary metrics"""
+    completed_tasks, total_tasks = progress_index.overall()
+
+    with aggregate_slots["summary"].container():
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total Tasks", total_tasks)
+        with col2:
+            st.metric("Completed", completed_tasks)
+        with col3:
+            st.metric("Completion Rate", f"{completed_tasks/total_tasks:.1%}" if total_tasks > 0 else "0%")
+
+        if total_tasks and completed_tasks == total_tasks:
+            st.balloons()
+            st.success("🎉 Congratulations! You've completed all tasks. Ready to launch your bill-pay aggregator!")
+
+def get_schedule(session):
+    """The session's Schedule, built on first use; readiness and critical path then follow every toggle"""
+    if session["schedule"] is None:
+        schedule = Schedule(get_dependency_graph(SCHEMA_PATH))
+        session["progress_index"].attach(schedule)
+        session["schedule"] = schedule
+    return session["schedule"]
+
+def render_plan(session):
+    """Display readiness, the remaining critical path and a Gantt chart of the next tasks"""
+    schedule = get_schedule(session)
+    today = datetime.now().date()
+    critical = schedule.critical_path()
+    on_path = {item.key for item in critical}
+    with aggregate_slots["plan"].container():
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Ready", schedule.ready)
+        col2.metric("Blocked", schedule.blocked)
+        col3.metric("Days left", f"{schedule.finish:g}", help=f"Earliest finish: {today + timedelta(days=schedule.finish)}")
+        if not critical:
+            return
+        st.caption(f"Critical path: {len(critical)} tasks, highlighted below")
+        # Critical tasks first, then the earliest-starting ones, up to PLAN_ROWS bars
+        rows = critical[:PLAN_ROWS]
+        if len(rows) < PLAN_ROWS:
+            rows += heapq.nsmallest(
+                PLAN_ROWS - len(rows),
+                (item for item in registry.items if not schedule.done[item.index] and item.key not in on_path),
+                key=lambda item: (schedule.start_at[item.index], schedule.graph.position[item.index]),
+            )
+        bars = []
+        for item in sorted(rows, key=lambda item: (schedule.start_at[item.index], schedule.graph.position[item.index])):
+            start, finish = schedule.window(item.key)
+            bars.append({
+                "Task": item.label,
+                "Start": str(today + timedelta(days=start)),
+                # Zero-length milestones still get a visible sliver
+                "Finish": str(today + timedelta(days=max(finish, start + 0.5))),
+                "Status": "critical" if item.key in on_path else schedule.status(item.key),
+            })
+        st.vega_lite_chart(
+            {
+                "data": {"values": bars},
+                "mark": "bar",
+                "encoding": {
+                    "y": {"field": "Task", "type": "nominal", "sort": None, "axis": {"labelLimit": 320}},
+                    "x": {"field": "Start", "type": "temporal"},
+                    "x2": {"field": "Finish"},
+                    "color": {"field": "Status", "type": "nominal"},
+                },
+            },
+            width="stretch",
+        )
+
+def refresh_aggregates(session):
+    """Redraw the sidebar and summary placeholders from the current state"""
+    if aggregate_slots:
+        with profiler.span("aggregates:sidebar"):
+            render_sidebar_progress(session["progress_index"])
+        with profiler.span("aggregates:summary"):
+            render_summary(session["progress_index"])
+        if "plan" in aggregate_slots:
+            with profiler.span("aggregates:plan"):
+                render_plan(session)
+
+def render_profile_panel():
+    """Show the latest rerun timings in the sidebar debug panel"""
+    latest = profiler.records[-1]
+    with aggregate_slots["profile"].container():
+        st.write(
+            f"**{latest['scope']}** ({latest['cause']}): {latest['total_ms']:.1f} ms, "
+            f"{latest['widgets']} checkboxes, {latest['session_keys']} session keys, "
+            f"{latest['state_bytes']} state bytes"
+        )
+        sessions = latest["sessions"]
+        st.caption(
+            f"Sessions on this server: {sessions['live']} live ({sessions['live_bytes'] / 1024:.1f} KB tracked), "
+            f"{sessions['spilled']} spilled to the store"
+        )
+        st.dataframe(
+            sorted(
+                ({"span": name, "ms": span["ms"], "calls": span["calls"]} for name, span in latest["spans"].items()),
+                key=lambda row: -row["ms"],
+            ),
+            hide_index=True,
+        )
+        st.caption("Recent reruns: " + ", ".join(
+            f"{record['scope']} {record['total_ms']:.0f} ms" for record in reversed(profiler.records)
+        ))
+
+def finish_profile():
+    """Close the profiler record for this rerun and refresh the debug panel"""
+    record = profiler.finish(
+        session_keys=len(st.session_state),
+        state_bytes=state_memory(current_session()["checklist_state"]),
+        sessions=session_manager.stats(),
+    )
+    if record and "profile" in aggregate_slots:
+        render_profile_panel()
+
+if COMPACT_STATE:
+    savings = compact_savings(registry, current_session()["checklist_state"])
+    st.sidebar.caption(
+        f"Compact state: {savings['compact_bytes']} bytes/session "
+        f"(saves {savings['saved_bytes']} bytes vs. {savings['dict_bytes']})"
     )
 
-uploaded_file = st.sidebar.file_uploader("📤 Import Progress", type="json")
-if uploaded_file is not None:
+# Project switcher and cross-project rollup for tenant-scoped checklists
+if tenant:
+    st.sidebar.subheader(f"🏢 {tenant}")
+    projects = store.projects(tenant)
+
+    chosen_project = st.sidebar.selectbox("Project", projects, index=projects.index(project))
+    if chosen_project != project:
+        st.query_params["project"] = chosen_project
+        st.rerun()
+    with st.sidebar.form("new_project", clear_on_submit=True):
+        new_project = st.text_input("New project")
+        if st.form_submit_button("➕ Create project") and new_project:
+            try:
+                store.project_checklist(tenant, new_project)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.query_params["project"] = new_project
+                st.rerun()
+
+    with st.sidebar.expander("📊 All projects"):
+        by_section = {}
+        for row in store.rollup(tenant):
+            section_row = by_section.setdefault(row["section_id"], {"Section": registry.sections[row["section_id"]].progress_label})
+            section_row[row["project"]] = f"{row['completed']}/{row['total']}"
+        st.dataframe(
+            [by_section[section.id] for section in registry.sections.values() if section.id in by_section],
+            hide_index=True,
+        )
+
+# Export/Import functionality
+def export_payload(fmt, since):
+    """Serialize progress for download, reusing the last payload until the state changes"""
+    session = current_session()
+    progress_index, export_cache = session["progress_index"], session["export_cache"]
+    cache_key = (progress_index.version, fmt, since)
+    if export_cache.get("key") != cache_key:
+        if since is None:
+            values = progress_index.snapshot()
+        elif store is not None:
+            # The event log outlives spills; a rehydrated index only knows changes made since
+            values = store.changes_since(checklist_id, since)
+        else:
+            values = progress_index.changes_since(since)
+        export_cache.update(key=cache_key, data=serialize_progress(values, fmt))
+    return export_cache["data"]
+
+def mark_exported():
+    """Remember when the last export happened, as the baseline for delta exports"""
+    st.session_state.last_export_at = time.time()
+    profiler.set_cause("export")
+
+export_format = st.sidebar.selectbox(
+    "Export format", list(EXPORT_FORMATS), format_func=lambda fmt: EXPORT_FORMATS[fmt][0]
+)
+last_export_at = st.session_state.get("last_export_at")
+delta_only = st.sidebar.checkbox(
+    "Only changes since last export",
+    disabled=last_export_at is None,
+    help="Exports only the items changed since your last export in this session",
+)
+export_since = last_export_at if delta_only and last_export_at is not None else None
+_, export_extension, export_mime = EXPORT_FORMATS[export_format]
+# The payload is built lazily on click, on a separate thread, and cached per state version
+st.sidebar.download_button(
+    "📥 Export Progress",
+    data=lambda: export_payload(export_format, export_since),
+    file_name=f"billpay_progress_{datetime.now().strftime('%Y%m%d')}{'_delta' if export_since else ''}{export_extension}",
+    mime=export_mime,
+    on_click=mark_exported,
+)
+
+uploaded_file = st.sidebar.file_uploader("📤 Import Progress", type=["json", "gz"])
+# The uploader keeps its file across reruns, so each upload is applied only once
+if uploaded_file is not None and st.session_state.get("imported_file_id") != uploaded_file.file_id:
+    st.session_state.imported_file_id = uploaded_file.file_id
     try:
-        imported_state = json.loads(uploaded_file.read())
-        st.session_state.checklist_state.update(imported_state)
-        st.sidebar.success("Progress imported!")
+        with profiler.span("import"):
+            diff = diff_import(
+                registry,
+                current_session()["checklist_state"],
+                iter_progress_file(
+                    open_progress_file(uploaded_file), max_bytes=IMPORT_MAX_BYTES, max_keys=IMPORT_MAX_KEYS
+                ),
+            )
+    except ProgressFileError as e:
+        st.sidebar.error(f"Invalid file format: {e}")
+    else:
+        changes = diff.changes
+        apply_changes(current_session(), changes, "import")
+        # Checkboxes render below, so dropping their widget values makes them pick up the import
+        for key in changes:
+            st.session_state.pop(f"cb_{key}", None)
+        summary = f"{len(diff.added)} added, {len(diff.changed)} changed, {diff.unchanged} unchanged"
+        if diff.ignored:
+            summary += f", {len(diff.ignored)} unknown keys ignored"
+        if diff:
+            st.sidebar.success(f"Progress imported: {summary}")
+        else:
+            st.sidebar.info(f"Nothing to import: {summary}")
+
+# Each section is a fragment, so a checkbox click only reruns its own section
+native_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+fragment = native_fragment or (lambda f: f)
+# In shared mode a small timed fragment checks for peer changes; the rest of the page
+# only reruns when a peer actually changed something
+sync_fragment = native_fragment(run_every=SYNC_INTERVAL) if native_fragment else fragment
+
+@sync_fragment
+def render_sync_status():
+    """Show connected peers and rerun the app when they pushed changes"""
+    session = current_session()
+    if not in_full_run and apply_remote_changes(session):
+        # Streamlit only lets widget callbacks target other fragments, so redraw the page
         st.rerun()
-    except:
-        st.sidebar.error("Invalid file format")
+    peers = session["subscription"].peers()
+    st.caption(f"👥 Shared checklist: {peers} other session{'s' if peers != 1 else ''} connected")
+
+if shared:
+    with st.sidebar:
+        render_sync_status()
+
+# Undo/redo and point-in-time replay
+def step_history(kind):
+    """Undo or redo the latest change group; runs as a callback before the checkboxes render"""
+    profiler.set_cause(kind)
+    session = current_session()
+    changes = session["history"].undo() if kind == "undo" else session["history"].redo()
+    apply_changes(session, changes, kind)
+    for key in changes:
+        st.session_state.pop(f"cb_{key}", None)
+
+with st.sidebar.expander("🕓 History"):
+    undo_col, redo_col = st.columns(2)
+    undo_col.button("↩️ Undo", on_click=step_history, args=("undo",))
+    redo_col.button("↪️ Redo", on_click=step_history, args=("redo",))
+    # Replaying is a store query, so only do it while the view is switched on
+    bounds = None
+    if store is not None and st.toggle("View past progress"):
+        bounds = store.history_bounds(checklist_id)
+        if bounds is None:
+            st.caption("No changes recorded yet")
+    if bounds:
+        first, last = bounds
+        weeks = int((max(last, time.time()) - first) // (7 * 86400)) + 1
+        week = st.slider("Week", 1, weeks, weeks) if weeks > 1 else 1
+        as_of = min(first + week * 7 * 86400, time.time())
+        past = ProgressIndex(registry, store.state_at(checklist_id, as_of))
+        completed, total = past.overall()
+        st.caption(f"As of {datetime.fromtimestamp(as_of):%Y-%m-%d %H:%M}: {completed}/{total} tasks completed")
+        st.dataframe(
+            [
+                {"Section": section.progress_label, "Completed": "{}/{}".format(*past.section(section.id))}
+                for section in registry.sections.values()
+            ],
+            hide_index=True,
+        )
 
 # Main content in tabs
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
-    "🔍 Phase A-F", "⚖️ Compliance", "🚀 MVP", "🏆 Competitors", "📈 Market", "👥 Team & Budget", "💰 Investor Pitch"
-])
+def section_window(section):
+    """Render a page picker for long sections and return the (start, stop) item slice to show"""
+    total = len(section.items)
+    pages = -(-total // PAGE_SIZE)
+    if pages <= 1:
+        return 0, total
+    if hasattr(st, "pagination"):
+        page = st.pagination(pages, key=f"page_{section.id}")
+    else:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=f"page_{section.id}")
+    start = (page - 1) * PAGE_SIZE
+    stop = min(start + PAGE_SIZE, total)
+    st.caption(f"Showing tasks {start + 1}-{stop} of {total}")
+    return start, stop
 
-with tab1:
-    st.header("Development Phases (Weeks 1-24)")
-    
-    # Phase A - Prove real demand (Weeks 1-3)
-    st.subheader("📋 Phase A: Prove Real Demand (Weeks 1-3)")
-    phase_a_tasks = []
-    
-    phase_a_tasks.append(create_checkbox(
-        "define_promise", 
-        "Define shortest promise: 'We take one payment and pay all your bills—on time, every time'"
-    ))
-    
-    phase_a_tasks.append(create_checkbox(
-        "recruit_users", 
-        "Recruit 15-25 target users (busy households, roommates, freelancers, caregivers)"
-    ))
-    
-    phase_a_tasks.append(create_checkbox(
-        "smoke_test", 
-        "Create no-code smoke test: 2-page site with Typeform for bill collection data"
-    ))
-    
-    phase_a_tasks.append(create_checkbox(
-        "success_metrics", 
-        "Achieve success metrics: ≥40% email signups, ≥60% willing to connect bank + pay 3+ bills"
-    ))
-    
-    progress_bar(sum(phase_a_tasks), len(phase_a_tasks), "Phase A")
-    
-    # Phase B - Regulatory & Bank Path (Weeks 2-6)
-    st.subheader("🏛️ Phase B: Choose Regulatory & Bank Path (Weeks 2-6)")
-    phase_b_tasks = []
-    
-    phase_b_tasks.append(create_checkbox(
-        "research_agent_payee", 
-        "Research 'Agent of Payee' model and state exemptions (CA DFPI guidance)"
-    ))
-    
-    phase_b_tasks.append(create_checkbox(
-        "evaluate_partners", 
-        "Evaluate BaaS partners: Dwolla, Modern Treasury, Moov"
-    ))
-    
-    phase_b_tasks.append(create_checkbox(
-        "choose_path", 
-        "Choose initial path: Partner with licensed provider for quick pilot"
-    ))
-    
-    phase_b_tasks.append(create_checkbox(
-        "compliance_plan", 
-        "Plan compliance guardrails: Nacha WEB debits, Regulation E, OFAC screening"
-    ))
-    
-    progress_bar(sum(phase_b_tasks), len(phase_b_tasks), "Phase B")
-    
-    # Phase C - MVP Design (Weeks 4-8)
-    st.subheader("🎨 Phase C: MVP Design & Prototype (Weeks 4-8)")
-    phase_c_tasks = []
-    
-    phase_c_tasks.append(create_checkbox(
-        "user_flows", 
-        "Design user flows: Link bank → set debit date → add billers → autopay rules"
-    ))
-    
-    phase_c_tasks.append(create_checkbox(
-        "bill_intake", 
-        "Design bill intake: login to biller, scan/upload PDF, email parsing"
-    ))
-    
-    phase_c_tasks.append(create_checkbox(
-        "feasibility_hack", 
-        "Plan feasibility hack: Doxo/Papaya-style scan+pay for long-tail billers"
-    ))
-    
-    phase_c_tasks.append(create_checkbox(
-        "figma_prototype", 
-        "Create clickable Figma prototype and test with 15-25 users"
-    ))
-    
-    progress_bar(sum(phase_c_tasks), len(phase_c_tasks), "Phase C")
-    
-    # Phase D - Build MVP (Weeks 8-16)
-    st.subheader("⚙️ Phase D: Build MVP (Weeks 8-16)")
-    phase_d_tasks = []
-    
-    st.write("**Tech Stack:**")
-    phase_d_tasks.append(create_checkbox("frontend_stack", "Frontend: Next.js, TypeScript, Tailwind"))
-    phase_d_tasks.append(create_checkbox("backend_stack", "Backend: Node (NestJS) or Python (FastAPI)"))
-    phase_d_tasks.append(create_checkbox("database_stack", "Database: Postgres + row-level encryption, Redis queues"))
-    phase_d_tasks.append(create_checkbox("infra_stack", "Infrastructure: AWS/GCP + managed secrets, VPC, security groups"))
-    
-    st.write("**Vendor Integrations:**")
-    phase_d_tasks.append(create_checkbox("bank_linking", "Bank linking: Plaid or Mastercard Finicity"))
-    phase_d_tasks.append(create_checkbox("ach_origination", "ACH origination: Dwolla/Moov/Modern Treasury"))
-    phase_d_tasks.append(create_checkbox("kyc_aml", "KYC/AML: Persona/Alloy + OFAC checks"))
-    phase_d_tasks.append(create_checkbox("check_fallback", "Check fallback for non-electronic billers"))
-    
-    st.write("**Risk & Funds Flow:**")
-    phase_d_tasks.append(create_checkbox("funds_flow", "Implement conservative funds flow: T-0 debit, T-2/3 payout"))
-    phase_d_tasks.append(create_checkbox("risk_policy", "Risk policy: No payout until debit settles, per-biller caps"))
-    
-    progress_bar(sum(phase_d_tasks), len(phase_d_tasks), "Phase D")
-    
-    # Phase E - Pilot (Weeks 16-24)
-    st.subheader("🧪 Phase E: Pilot (Weeks 16-24)")
-    phase_e_tasks = []
-    
-    phase_e_tasks.append(create_checkbox("private_beta", "Launch private beta with 200-500 users"))
-    phase_e_tasks.append(create_checkbox("measure_metrics", "Measure: on-time %, late-fee reductions, failed debit rate, bills/user"))
-    phase_e_tasks.append(create_checkbox("rtp_fednow", "Add RTP/FedNow for last-minute payments where supported"))
-    
-    progress_bar(sum(phase_e_tasks), len(phase_e_tasks), "Phase E")
-    
-    # Phase F - Go-to-Market (Months 6-12)
-    st.subheader("🚀 Phase F: Go-to-Market & Fundraising (Months 6-12)")
-    phase_f_tasks = []
-    
-    st.write("**Target Segments:**")
-    phase_f_tasks.append(create_checkbox("roommate_segment", "Roommate/household splits with single source debit"))
-    phase_f_tasks.append(create_checkbox("caregiver_segment", "Caregivers managing parents' bills"))
-    phase_f_tasks.append(create_checkbox("gig_worker_segment", "Gig workers needing weekly smoothing"))
-    
-    phase_f_tasks.append(create_checkbox("pricing_model", "Set pricing: Free bank payments, $5-8/mo premium features"))
-    
-    progress_bar(sum(phase_f_tasks), len(phase_f_tasks), "Phase F")
+@fragment
+def render_section(section):
+    """Render one checklist section followed by its progress bar"""
+    fragment_run = not in_full_run
+    if fragment_run:
+        profiler.begin(f"fragment:{section.id}")
+    session = current_session()
+    sync_widgets(session)
+    if section.subheader:
+        st.subheader(section.subheader)
+    start, stop = section_window(section)
+    # Item indexes are contiguous within a section, so positions come from the first item
+    offset = section.items[0].index
+    with profiler.span(f"checkboxes:{section.id}"):
+        for group in section.groups:
+            group_start = group.items[0].index - offset
+            if group_start >= stop or group_start + len(group.items) <= start:
+                continue
+            if group.subheader:
+                st.subheader(group.subheader)
+            if group.heading:
+                st.write(f"**{group.heading}**")
+            for item in group.items[max(start - group_start, 0):stop - group_start]:
+                create_checkbox(session, item.key, item.label, item.help)
+    with profiler.span(f"progress:{section.id}"):
+        progress_bar(*session["progress_index"].section(section.id), section.progress_label)
+    refresh_aggregates(session)
+    if fragment_run:
+        st.session_state.pop("toggled_keys", None)
+        finish_profile()
 
-with tab2:
-    st.header("⚖️ Compliance Requirements")
-    
-    compliance_tasks = []
-    
-    st.subheader("📋 Legal Structure")
-    compliance_tasks.append(create_checkbox(
-        "mtl_research", 
-        "Research Money Transmitter License requirements by state",
-        "Most states require MTL unless using agent-of-payee exemption"
-    ))
-    
-    compliance_tasks.append(create_checkbox(
-        "agent_payee_contracts", 
-        "Negotiate agent-of-payee contracts with major billers",
-        "Written agreements needed for exemption in most states"
-    ))
-    
-    st.subheader("🏦 Banking Compliance")
-    compliance_tasks.append(create_checkbox(
-        "nacha_web_debits", 
-        "Implement Nacha WEB debit authentication and validation",
-        "Must authenticate user and validate bank account for first-time WEB debits"
-    ))
-    
-    compliance_tasks.append(create_checkbox(
-        "regulation_e", 
-        "Build Regulation E error resolution process",
-        "10 business day investigation timeline, 60-day notice window"
-    ))
-    
-    compliance_tasks.append(create_checkbox(
-        "ofac_screening", 
-        "Implement OFAC sanctions screening program",
-        "Screen all counterparties and maintain documented controls"
-    ))
-    
-    st.subheader("📄 Documentation")
-    compliance_tasks.append(create_checkbox("compliance_docs", "Create compliance documentation and procedures"))
-    compliance_tasks.append(create_checkbox("fintech_counsel", "Engage fintech counsel for regulatory guidance"))
-    
-    progress_bar(sum(compliance_tasks), len(compliance_tasks), "Compliance")
+@st.cache_resource
+def get_search_index(path):
+    """Build the task search index once per process"""
+    return SearchIndex(get_registry(path))
 
-with tab3:
-    st.header("🚀 MVP Features")
-    
-    mvp_tasks = []
-    
-    st.subheader("✅ Must-Have Features")
-    mvp_tasks.append(create_checkbox("one_debit_many_bills", "One debit → many bills (monthly date + 'pay now')"))
-    mvp_tasks.append(create_checkbox("bill_capture", "Bill capture: link accounts, scan bills, forward emails"))
-    mvp_tasks.append(create_checkbox("payment_calendar", "Payment calendar with due-date guardrails and autopay rules"))
-    mvp_tasks.append(create_checkbox("reconciliation", "Reconciliation center: status, payout rail, proof/confirmation"))
-    
-    st.subheader("🌟 V1 Differentiators")
-    mvp_tasks.append(create_checkbox("weekly_smoothing", "Weekly smoothing: split monthly debit into four"))
-    mvp_tasks.append(create_checkbox("last_minute_save", "Last-minute save: instant payout (RTP/FedNow) with service fee"))
-    mvp_tasks.append(create_checkbox("household_mode", "Household mode: split bills among roommates"))
-    mvp_tasks.append(create_checkbox("caregiver_mode", "Caregiver mode: manage multiple profiles with permissions"))
-    
-    progress_bar(sum(mvp_tasks), len(mvp_tasks), "MVP Features")
+search_index = get_search_index(SCHEMA_PATH)
 
-with tab4:
-    st.header("🏆 Competitive Analysis")
-    
-    competitor_tasks = []
-    
-    st.subheader("🔍 Research Completed")
-    competitors = [
-        ("doxo", "Large pay-any-bill network, doxoBILLS experience"),
-        ("Papaya", "Snap photo, pay any U.S. bill service"),
-        ("PayPal Bill Pay", "Manage billers inside PayPal wallet"),
-        ("Quicken Bill Manager", "Quick Pay and Check Pay in Quicken"),
-        ("Chase Online Bill Pay", "Bank bill pay with eBills"),
-        ("SoFi Bill Pay", "Schedule payments from SoFi checking"),
-        ("Wells Fargo Bill Pay", "Mainstream bank bill pay"),
-        ("Western Union Bill Pay", "Online/in-person biller payments"),
-        ("MoneyGram Bill Pay", "Cash/in-person coverage"),
-        ("SilverBills/Paytrust", "Concierge bill management for seniors")
-    ]
-    
-    for comp_id, comp_desc in competitors:
-        competitor_tasks.append(create_checkbox(f"research_{comp_id}", f"Research {comp_desc}"))
-    
-    st.subheader("📊 Differentiation Strategy")
-    competitor_tasks.append(create_checkbox("diff_one_debit", "Define one-debit promise differentiation"))
-    competitor_tasks.append(create_checkbox("diff_instant_payments", "Plan instant 'save me' payouts"))
-    competitor_tasks.append(create_checkbox("diff_caregiver", "Design caregiver & household modes"))
-    competitor_tasks.append(create_checkbox("diff_transparency", "Plan transparent fees and late-fee guarantee"))
-    
-    progress_bar(sum(competitor_tasks), len(competitor_tasks), "Competitive Analysis")
+def toggle_from_search(key, widget_key):
+    """Apply a toggle made in the search results to the checklist"""
+    apply_changes(current_session(), {key: st.session_state[widget_key]})
+    # Let the section checkbox pick the new value up from the state
+    st.session_state.pop(f"cb_{key}", None)
+    st.session_state.search_toggled = True
 
-with tab5:
-    st.header("📈 Market Analysis")
-    
-    market_tasks = []
-    
-    st.subheader("📊 Market Research")
-    market_tasks.append(create_checkbox("tam_research", "Research total U.S. household bill spend (multi-trillion market)"))
-    market_tasks.append(create_checkbox("payment_habits", "Analyze current payment habits (~22% via bank bill-pay)"))
-    market_tasks.append(create_checkbox("household_count", "Validate U.S. household count (~132-134M in 2025)"))
-    
-    st.subheader("💰 Revenue Modeling")
-    market_tasks.append(create_checkbox("freemium_model", "Model freemium pricing (free bank, $6/mo premium)"))
-    market_tasks.append(create_checkbox("penetration_scenarios", "Calculate revenue scenarios (2% households = $187M ARR)"))
-    market_tasks.append(create_checkbox("additional_revenue", "Plan card fees and B2B biller revenue-share"))
-    
-    progress_bar(sum(market_tasks), len(market_tasks), "Market Analysis")
+@fragment
+def render_search():
+    """Search box with filters; typing a query reruns only this fragment"""
+    if st.session_state.pop("search_toggled", False):
+        # A result was toggled: rerun the app so its section and the totals update
+        st.rerun()
+    query_col, section_col, incomplete_col = st.columns([3, 2, 1], vertical_alignment="bottom")
+    query = query_col.text_input("🔎 Search tasks", placeholder="e.g. OFAC, Plaid, pricing")
+    section_id = section_col.selectbox(
+        "Section",
+        [None] + list(registry.sections),
+        format_func=lambda sid: "All sections" if sid is None else registry.sections[sid].progress_label,
+    )
+    incomplete_only = incomplete_col.checkbox("Incomplete only")
+    if not query:
+        return
 
-with tab6:
-    st.header("👥 Team & Budget")
-    
-    team_tasks = []
-    
-    st.subheader("👥 Team Assembly")
-    roles = [
-        ("Product Lead", "Lead product development and strategy"),
-        ("Compliance Lead", "Fractional fintech counsel"),
-        ("Senior Full-stack Engineer", "Lead technical development"),
-        ("Backend/Payments Engineer", "Payments infrastructure"),
-        ("Designer", "UI/UX design and user experience"),
-        ("Ops/Support", "Operations and customer support")
-    ]
-    
-    for role_id, role_desc in roles:
-        team_tasks.append(create_checkbox(f"hire_{role_id.lower().replace(' ', '_')}", f"Hire {role_desc}"))
-    
-    st.subheader("💰 Budget Planning")
-    team_tasks.append(create_checkbox("budget_plan", "Plan $300k-$700k build budget for first 6-9 months"))
-    team_tasks.append(create_checkbox("vendor_costs", "Estimate vendor costs (Plaid, payments platform, legal)"))
-    
-    st.subheader("🎯 Milestones")
-    milestones = [
-        ("Month 2", "Clickable prototype + bank/payments partner selected"),
-        ("Month 4", "MVP live with internal users; start private beta"),
-        ("Month 6", "500+ beta users; KPIs on performance metrics"),
-        ("Month 9", "Public launch + seed raise with real metrics")
-    ]
-    
-    for milestone_id, milestone_desc in milestones:
-        team_tasks.append(create_checkbox(f"milestone_{milestone_id.lower().replace(' ', '_')}", f"{milestone_id}: {milestone_desc}"))
-    
-    progress_bar(sum(team_tasks), len(team_tasks), "Team & Budget")
+    progress_index = current_session()["progress_index"]
+    start = time.perf_counter()
+    results = search_index.search(
+        query,
+        progress=progress_index,
+        incomplete_only=incomplete_only,
+        section_id=section_id,
+        limit=SEARCH_LIMIT,
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.caption(f"{len(results)}{'+' if len(results) == SEARCH_LIMIT else ''} matches in {elapsed_ms:.2f} ms")
+    for item in results:
+        value = progress_index.get(item.key)
+        # The value is part of the key, so the result never shows a stale widget value
+        widget_key = f"search_cb_{item.key}_{int(value)}"
+        st.checkbox(
+            item.label,
+            value=value,
+            key=widget_key,
+            help=f"{registry.tab_index[item.tab_id].label} › {registry.sections[item.section_id].progress_label}",
+            on_change=toggle_from_search,
+            args=(item.key, widget_key),
+        )
 
-with tab7:
-    st.header("💰 Investor Pitch Preparation")
-    
-    pitch_tasks = []
-    
-    st.subheader("📖 Narrative Elements")
-    pitch_tasks.append(create_checkbox("problem_statement", "Craft problem: Americans juggle 10-15 bills, fragmented UX, late fees"))
-    pitch_tasks.append(create_checkbox("solution_statement", "Define solution: One debit. All bills. Cash-flow smoothing + instant rescue"))
-    pitch_tasks.append(create_checkbox("why_now", "Explain why now: Open banking + modern ACH/RTP rails + sponsor banks"))
-    pitch_tasks.append(create_checkbox("market_size", "Present market: Multi-trillion annual volume, single-digit % served"))
-    pitch_tasks.append(create_checkbox("moat_strategy", "Define moat: Biller network + agent contracts + guarantee data"))
-    
-    st.subheader("📊 Materials")
-    pitch_tasks.append(create_checkbox("pitch_deck", "Create investor pitch deck"))
-    pitch_tasks.append(create_checkbox("financial_model", "Build financial model with unit economics"))
-    pitch_tasks.append(create_checkbox("demo_ready", "Prepare product demo"))
-    pitch_tasks.append(create_checkbox("metrics_dashboard", "Create metrics dashboard for traction"))
-    
-    progress_bar(sum(pitch_tasks), len(pitch_tasks), "Investor Pitch")
+with profiler.span("search"):
+    render_search()
+
+# Gantt view of the remaining plan, redrawn with the other aggregates on every toggle
+plan_slot = st.empty() if st.toggle("🗓️ Show plan", help="Dependencies, ready tasks and the critical path") else None
+
+@st.cache_data(max_entries=REVENUE_CACHE_ENTRIES, show_spinner=False)
+def run_revenue_simulation(inputs_key, trials, seed=0):
+    """Memoized by the input tuple, so returning to earlier slider values is instant"""
+    return simulate_arr(RevenueInputs(*inputs_key), trials, seed)
+
+@fragment
+def render_revenue_simulator():
+    """Interactive ARR simulator; moving a slider reruns only this fragment"""
+    st.subheader("🎲 Revenue Simulator")
+    defaults = RevenueInputs()
+    col1, col2 = st.columns(2)
+    inputs = RevenueInputs(
+        households_m=col1.slider("U.S. households (M)", 120.0, 145.0, defaults.households_m, 0.5, key="rev_households"),
+        penetration_pct=col1.slider("Penetration (%)", 0.0, 10.0, defaults.penetration_pct, 0.1, key="rev_penetration"),
+        premium_pct=col1.slider("Premium users (%)", 0.0, 100.0, defaults.premium_pct, 1.0, key="rev_premium"),
+        premium_price=col2.slider("Premium price ($/mo)", 0.0, 15.0, defaults.premium_price, 0.5, key="rev_price"),
+        monthly_churn_pct=col2.slider("Monthly churn (%)", 0.0, 10.0, defaults.monthly_churn_pct, 0.1, key="rev_churn"),
+        other_revenue=col2.slider(
+            "Card & biller revenue share ($/user/yr)", 0.0, 60.0, defaults.other_revenue, 1.0, key="rev_other"
+        ),
+    )
+    trials_col, target_col = st.columns(2)
+    trials = trials_col.select_slider(
+        "Trials", [100_000, 250_000, 500_000, 1_000_000], format_func="{:,}".format, key="rev_trials"
+    )
+    target = target_col.number_input("Target ARR ($M)", min_value=0.0, value=187.0, step=10.0, key="rev_target")
+
+    start = time.perf_counter()
+    result = run_revenue_simulation(inputs.key(), trials)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    percentiles = result["percentiles"]
+    cols = st.columns(4)
+    cols[0].metric("P10 ARR", f"${percentiles[10]:,.0f}M")
+    cols[1].metric("Median ARR", f"${percentiles[50]:,.0f}M")
+    cols[2].metric("P90 ARR", f"${percentiles[90]:,.0f}M")
+    cols[3].metric(f"P(ARR ≥ ${target:,.0f}M)", f"{probability_above(result, target):.1%}")
+    st.bar_chart(result["histogram"], x="ARR ($M)", y="Trials")
+    st.caption(
+        f"{result['trials']:,} trials in {elapsed_ms:.0f} ms · mean ${result['mean']:,.0f}M · "
+        + " · ".join(f"P{p} ${percentiles[p]:,.0f}M" for p in PERCENTILES if p not in (10, 50, 90))
+    )
+
+# Extra content rendered after a tab's checklist sections
+TAB_EXTRAS = {"market": render_revenue_simulator}
+
+tab_labels = [tab.label for tab in registry.tabs]
+try:
+    tabs = st.tabs(tab_labels, key="active_tab", on_change="rerun") if LAZY_TABS else st.tabs(tab_labels)
+except TypeError:
+    # Streamlit versions without stateful tabs always render every tab
+    tabs = st.tabs(tab_labels)
+
+for tab_container, tab in zip(tabs, registry.tabs):
+    # Hidden tabs report False; tabs that don't track state report None and are rendered
+    if getattr(tab_container, "open", None) is False:
+        continue
+    with tab_container, profiler.span(f"tab:{tab.id}"):
+        st.header(tab.header)
+        for section in tab.sections:
+            render_section(section)
+        if tab.id in TAB_EXTRAS:
+            TAB_EXTRAS[tab.id]()
 
 # Footer with summary
 st.divider()
 st.subheader("📋 Quick Summary")
-if st.session_state.checklist_state:
-    total_tasks = len(st.session_state.checklist_state)
-    completed_tasks = sum(1 for v in st.session_state.checklist_state.values() if v)
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Total Tasks", total_tasks)
-    with col2:
-        st.metric("Completed", completed_tasks)
-    with col3:
-        st.metric("Completion Rate", f"{completed_tasks/total_tasks:.1%}" if total_tasks > 0 else "0%")
-    
-    if completed_tasks == total_tasks:
-        st.balloons()
-        st.success("🎉 Congratulations! You've completed all tasks. Ready to launch your bill-pay aggregator!")
+summary_slot = st.empty()
+
+aggregate_slots.update(sidebar=sidebar_slot, summary=summary_slot)
+if plan_slot is not None:
+    aggregate_slots["plan"] = plan_slot
+refresh_aggregates(current_session())
 
 # Reset button
-if st.button("🔄 Reset All Progress", type="secondary"):
-    st.session_state.checklist_state = {}
-    st.rerun()
+def reset_progress():
+    """Clear all progress; runs as a callback so widget values can still be reset"""
+    profiler.set_cause("reset")
+    session = current_session()
+    # Reset is a logged change group like any other, so it can be undone
+    apply_changes(session, {key: False for key, value in session["progress_index"].snapshot().items() if value}, "reset")
+    # Reset widget values too, otherwise the checkboxes write their old values back
+    for widget_key in [k for k in st.session_state if str(k).startswith("cb_")]:
+        st.session_state[widget_key] = False
+
+st.button("🔄 Reset All Progress", type="secondary", on_click=reset_progress)
+
+if profiler.enabled:
+    with st.sidebar.expander("⏱️ Profiler", expanded=True):
+        aggregate_slots["profile"] = st.empty()
+
+def track_session():
+    """Report the session's approximate size to the session manager"""
+    session = current_session()
+    session_manager.track(session_handle, state_memory(session["checklist_state"]) + len(session["export_cache"].get("data", b"")))
+
+in_full_run = False
+st.session_state.pop("toggled_keys", None)
+track_session()
+finish_profile()
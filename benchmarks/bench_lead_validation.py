@@ -0,0 +1,105 @@
+"""Bulk lead-cleaning benchmark for lead_validation, on synthetic CSV and JSONL exports.
+
+Writes ``--rows`` synthetic leads (flat CSV rows, and nested JSONL leads
+shaped like the landing page's webhook payload) with a mix of national
+and international phone formats, messy emails and some invalid values,
+then times ``clean_file`` on each and reports rows per second. CSV is run
+both with Arrow (in blocks) and row by row:
+
+    python benchmarks/bench_lead_validation.py --rows 500000 --output bench.json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lead_validation import PHONE_RULES, clean_file  # noqa: E402
+
+SAMPLE_PHONES = {
+    "United States": ["(415) 555-0123", "+1 212 555 0199", "1-646-555-0142"],
+    "Canada": ["604 555 0188", "+1 (416) 555-0111"],
+    "United Kingdom": ["07911 123456", "+44 20 7946 0958"],
+    "Nigeria": ["0803 123 4567", "+234 812 345 6789", "2348031234567"],
+    "Kenya": ["0712 345 678", "+254 722 123456", "254712345678"],
+    "Ghana": ["024 123 4567", "+233 20 123 4567"],
+    "South Africa": ["082 123 4567", "+27 21 123 4567"],
+    "Uganda": ["0772 123456", "+256 772 123456"],
+    "Tanzania": ["0754 123 456", "+255 754 123 456"],
+    "Rwanda": ["0788 123 456", "+250 788 123 456"],
+    "India": ["98765 43210", "+91 22 1234 5678"],
+    "Philippines": ["0917 123 4567", "+63 2 8123 4567"],
+    "Mexico": ["55 1234 5678", "+52 1 55 1234 5678"],
+    "Brazil": ["(11) 91234-5678", "+55 21 3123 4567"],
+    "Colombia": ["300 123 4567", "+57 601 234 5678"],
+    "Other": ["+49 151 12345678", "+33 6 12 34 56 78"],
+}
+INVALID_PHONES = ["12345", "phone", "+1 555", "0000000"]
+EMAILS = ["ada@example.com", " Grace.Hopper@Navy.MIL ", "first.last+tag@sub.domain.io", "not-an-email", "a..b@x.com"]
+
+
+def synthetic_leads(n, seed=0):
+    rng = random.Random(seed)
+    countries = list(SAMPLE_PHONES)
+    for i in range(n):
+        country = rng.choice(countries)
+        phone = rng.choice(INVALID_PHONES) if rng.random() < 0.05 else rng.choice(SAMPLE_PHONES[country])
+        yield {
+            "first_name": f"Lead{i}",
+            "last_name": "Example",
+            "email": rng.choice(EMAILS),
+            "phone": phone,
+            "country": country,
+        }
+
+
+def write_exports(directory, n):
+    csv_path = os.path.join(directory, "leads.csv")
+    jsonl_path = os.path.join(directory, "leads.jsonl")
+    with open(csv_path, "w", encoding="utf-8", newline="") as f_csv, \
+            open(jsonl_path, "w", encoding="utf-8") as f_jsonl:
+        writer = None
+        for lead in synthetic_leads(n):
+            if writer is None:
+                writer = csv.DictWriter(f_csv, fieldnames=list(lead))
+                writer.writeheader()
+            writer.writerow(lead)
+            nested = {
+                "form_type": "contact_inquiry",
+                "personal_info": lead,
+                "transfer_info": {"primary_purpose": "Family Support", "expected_monthly_volume": "Under $500"},
+                "source": "streamlit_landing_page",
+            }
+            f_jsonl.write(json.dumps(nested) + "\n")
+    return csv_path, jsonl_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--output", help="Write results to this JSON file as well as stdout")
+    args = parser.parse_args(argv)
+
+    assert set(SAMPLE_PHONES) - {"Other"} == set(PHONE_RULES)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, jsonl_path = write_exports(tmp, args.rows)
+        for src, vectorized in ((csv_path, True), (csv_path, False), (jsonl_path, False)):
+            name = os.path.basename(src)
+            summary = clean_file(src, os.path.join(tmp, "clean-" + name), vectorized=vectorized)
+            result = {"file": name, "mode": "arrow" if vectorized else "rows",
+                      "size_mb": round(os.path.getsize(src) / 1e6, 1), **summary}
+            print(json.dumps(result), flush=True)
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
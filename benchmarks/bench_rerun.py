@@ -0,0 +1,202 @@
+"""Rerun-latency benchmark for app.py, driven headlessly with Streamlit's AppTest.
+
+Runs the checklist app against the bundled schema and against synthetic
+schemas of increasing size, and times the reruns triggered by toggling
+checkboxes, importing a progress file, clicking export and resetting.
+The export payload is built lazily by the download button, which AppTest
+never does, so it is timed separately: one full serialization per export
+format, as on a cache miss. Results are printed as JSON (one object per scale) and can be compared against a
+previous run to catch regressions:
+
+    python benchmarks/bench_rerun.py --scales bundled 1000 10000 --output bench.json
+    python benchmarks/bench_rerun.py --baseline bench.json --max-regression 1.25
+
+AppTest executes the whole script on every interaction, so these numbers
+are full-rerun costs; fragment reruns in a live session are cheaper.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from checklist_core import EXPORT_FORMATS, ProgressIndex, load_registry, serialize_progress  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+BUNDLED_SCHEMA = os.path.join(ROOT, "checklist.json")
+
+
+def synthetic_schema(n_items, n_tabs=7, section_size=50):
+    """Build a schema with n_items spread evenly over tabs of equal-sized sections"""
+    per_tab = -(-n_items // n_tabs)
+    tabs = []
+    made = 0
+    for t in range(n_tabs):
+        sections = []
+        tab_items = min(per_tab, n_items - made)
+        for s in range(0, tab_items, section_size):
+            items = [
+                {"key": f"t{t}_item{made + i}", "label": f"Synthetic task {made + i}", "help": f"Help text for task {made + i}"}
+                for i in range(min(section_size, tab_items - s))
+            ]
+            made += len(items)
+            sections.append({
+                "id": f"t{t}_s{s // section_size}",
+                "subheader": f"Section {t}.{s // section_size}",
+                "progress_label": f"Section {t}.{s // section_size}",
+                "groups": [{"items": items}],
+            })
+        if sections:
+            tabs.append({"id": f"tab{t}", "label": f"Tab {t}", "header": f"Synthetic tab {t}", "sections": sections})
+    return {"version": 1, "tabs": tabs}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed_run(at, timings, name):
+    start = time.perf_counter()
+    at.run()
+    timings.setdefault(name, []).append(time.perf_counter() - start)
+    if at.exception:
+        raise RuntimeError(f"{name}: app raised {at.exception[0].value}")
+
+
+def bench_scale(scale, schema_path, iterations, seed):
+    os.environ["CHECKLIST_SCHEMA"] = schema_path
+    with open(schema_path, encoding="utf-8") as f:
+        keys = [
+            item["key"]
+            for tab in json.load(f)["tabs"]
+            for section in tab["sections"]
+            for group in section["groups"]
+            for item in group["items"]
+        ]
+    rng = random.Random(seed)
+    timings = {}
+
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    timed_run(at, timings, "initial")
+    checkbox_count = sum(1 for cb in at.checkbox if cb.key and cb.key.startswith("cb_"))
+
+    for _ in range(iterations):
+        checkbox = rng.choice([cb for cb in at.checkbox if cb.key and cb.key.startswith("cb_")])
+        checkbox.set_value(not checkbox.value)
+        timed_run(at, timings, "toggle")
+
+    payload = json.dumps({key: rng.random() < 0.5 for key in keys}).encode("utf-8")
+    for i in range(iterations):
+        at.sidebar.get("file_uploader")[0].set_value((f"progress_{i}.json", payload, "application/json"))
+        timed_run(at, timings, "import")
+
+    for _ in range(iterations):
+        at.sidebar.get("download_button")[0].click()
+        timed_run(at, timings, "export_click")
+
+    # What export_payload does when the state changed since the last download
+    progress = ProgressIndex(load_registry(schema_path), {key: rng.random() < 0.5 for key in keys})
+    for fmt in EXPORT_FORMATS:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            serialize_progress(progress.snapshot(), fmt)
+            timings.setdefault(f"export:{fmt}", []).append(time.perf_counter() - start)
+
+    for _ in range(iterations):
+        next(b for b in at.button if "Reset" in b.label).click()
+        timed_run(at, timings, "reset")
+
+    return {
+        "scale": scale,
+        "items": len(keys),
+        "checkboxes": checkbox_count,
+        "lazy_tabs": os.environ.get("CHECKLIST_LAZY_TABS", "1") != "0",
+        "compact_state": os.environ.get("CHECKLIST_COMPACT_STATE", "0") == "1",
+        "reruns": {
+            name: {
+                "n": len(samples),
+                "p50_ms": round(statistics.median(samples) * 1000, 3),
+                "p95_ms": round(percentile(samples, 95) * 1000, 3),
+            }
+            for name, samples in timings.items()
+        },
+    }
+
+
+def find_regressions(results, baseline, max_regression):
+    """Return messages for p50 timings that grew by more than max_regression"""
+    previous = {entry["scale"]: entry for entry in baseline}
+    messages = []
+    for entry in results:
+        old = previous.get(entry["scale"])
+        if old is None:
+            continue
+        for name, stats in entry["reruns"].items():
+            old_stats = old["reruns"].get(name)
+            if old_stats and old_stats["p50_ms"] > 0 and stats["p50_ms"] / old_stats["p50_ms"] > max_regression:
+                messages.append(
+                    f"{entry['scale']}/{name}: p50 {old_stats['p50_ms']}ms -> {stats['p50_ms']}ms"
+                )
+    return messages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", default=["bundled", "1000", "10000", "50000"],
+                        help="'bundled' for checklist.json, or an item count for a synthetic schema")
+    parser.add_argument("--iterations", type=int, default=5, help="Reruns timed per interaction")
+    parser.add_argument("--eager-tabs", action="store_true", help="Render every tab (CHECKLIST_LAZY_TABS=0)")
+    parser.add_argument("--compact-state", action="store_true", help="Use the bitmask state store")
+    parser.add_argument("--section-size", type=int, default=50,
+                        help="Items per synthetic section; sections over CHECKLIST_PAGE_SIZE are paginated")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results to this JSON file as well as stdout")
+    parser.add_argument("--baseline", help="Compare against a previous results file")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="Fail when a p50 grows by more than this factor over the baseline")
+    args = parser.parse_args(argv)
+
+    os.environ["CHECKLIST_STORE"] = "memory"
+    os.environ["CHECKLIST_LAZY_TABS"] = "0" if args.eager_tabs else "1"
+    os.environ["CHECKLIST_COMPACT_STATE"] = "1" if args.compact_state else "0"
+    # Synthetic progress files for the larger scales exceed the default import limits
+    os.environ["CHECKLIST_IMPORT_MAX_BYTES"] = str(100_000_000)
+    os.environ["CHECKLIST_IMPORT_MAX_KEYS"] = str(1_000_000)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            if scale == "bundled":
+                schema_path = BUNDLED_SCHEMA
+            else:
+                schema_path = os.path.join(tmp, f"synthetic_{scale}.json")
+                with open(schema_path, "w", encoding="utf-8") as f:
+                    json.dump(synthetic_schema(int(scale), section_size=args.section_size), f)
+            result = bench_scale(scale, schema_path, args.iterations, args.seed)
+            print(json.dumps(result), flush=True)
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.max_regression)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Webhook client benchmark for 2app.py's lead delivery, against a local mock webhook.
+
+Sends bursts of leads concurrently, the way the delivery workers do, and
+compares a fresh ``requests.post`` per lead with the pooled keep-alive
+session from lead_delivery, optionally with gzip request bodies. The mock
+server counts the TCP connections it accepts, so socket churn shows up
+next to per-lead latency:
+
+    python benchmarks/bench_webhook.py --bursts 20 --burst-size 50 --workers 8 --latency-ms 5
+
+It then pushes ``--leads`` leads through a WebhookDispatcher (outbox and
+all) and times how long they take to be delivered one per request, in
+batches of ``--batch-size``, and in batches against a webhook that only
+takes single leads (so the dispatcher has to fall back).
+
+The mock speaks plain HTTP, so the savings exclude TLS handshakes, which
+pooling also avoids against the real (HTTPS) webhook.
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lead_delivery import DELIVERED, WebhookDispatcher, http_session, post_batch, post_json  # noqa: E402
+
+SAMPLE_LEAD = {
+    "form_type": "contact_inquiry",
+    "timestamp": "2025-01-01T12:00:00",
+    "personal_info": {
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "email": "ada@example.com",
+        "phone": "+14155550123",
+        "country": "United States",
+    },
+    "transfer_info": {"primary_purpose": "Family Support", "expected_monthly_volume": "$500 - $2,000"},
+    "message": "I send money to my family in Nairobi every month and want lower fees. " * 4,
+    "consent": {"marketing": True, "terms": True},
+    "source": "streamlit_landing_page",
+    "user_agent": "Streamlit App",
+    "lead_score": 50,
+}
+
+
+class MockWebhook(BaseHTTPRequestHandler):
+    """Accepts JSON (optionally gzipped) leads and answers 200 after ``latency``
+
+    An array of leads gets a result per lead, or a 400 when the server's
+    ``batching`` is off.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; don't let Nagle hold the body on kept-alive sockets
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        raw_bytes = len(body)
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        leads = json.loads(body)
+        if isinstance(leads, list) and not self.server.batching:
+            self._reply(400, b"expected one lead")
+            return
+        time.sleep(self.server.latency)
+        with self.server.stats_lock:
+            self.server.requests += 1
+            self.server.leads += len(leads) if isinstance(leads, list) else 1
+            self.server.body_bytes += raw_bytes
+        if isinstance(leads, list):
+            self._reply(200, json.dumps([{"id": lead["idempotency_key"], "ok": True} for lead in leads]).encode())
+        else:
+            self._reply(200, b"ok")
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock(latency):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockWebhook)
+    server.daemon_threads = True
+    server.latency = latency
+    server.stats_lock = threading.Lock()
+    server.batching = True
+    server.connections = server.requests = server.leads = server.body_bytes = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_mode(name, send, server, bursts, burst_size, workers, pause):
+    with server.stats_lock:
+        server.connections = server.requests = server.body_bytes = 0
+    latencies = []
+    failures = 0
+
+    def one():
+        start = time.perf_counter()
+        response = send()
+        return time.perf_counter() - start, response.status_code == 200
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(bursts):
+            for elapsed, ok in pool.map(lambda _: one(), range(burst_size)):
+                latencies.append(elapsed)
+                failures += not ok
+            time.sleep(pause)
+    total = time.perf_counter() - started - bursts * pause
+    return {
+        "mode": name,
+        "leads": len(latencies),
+        "failures": failures,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "leads_per_s": round(len(latencies) / total, 1),
+        "connections": server.connections,
+        "bytes_per_lead": round(server.body_bytes / max(server.requests, 1), 1),
+    }
+
+
+def run_dispatcher(name, server, url, session, leads, workers, batch_size, batch_wait, batching=True):
+    """Submit ``leads`` leads to a fresh dispatcher and time until all are delivered"""
+    with server.stats_lock:
+        server.connections = server.requests = server.leads = server.body_bytes = 0
+    server.batching = batching
+
+    def send(payload, key):
+        response = post_json(session, url, payload, headers={"Idempotency-Key": key})
+        return response.status_code == 200, response
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dispatcher = WebhookDispatcher(
+            send, os.path.join(tmp, "outbox.db"), workers=workers, poll_interval=0.5,
+            send_batch=lambda items: post_batch(session, url, items), batch_size=batch_size, batch_wait=batch_wait,
+        )
+        started = time.perf_counter()
+        for _ in range(leads):
+            dispatcher.submit(SAMPLE_LEAD)
+        while dispatcher.stats().get(DELIVERED, 0) < leads:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        final_batch_size = dispatcher.batch_size
+        dispatcher.shutdown()
+    return {
+        "mode": name,
+        "leads": leads,
+        "seconds": round(elapsed, 3),
+        "leads_per_s": round(leads / elapsed, 1),
+        "requests": server.requests,
+        "leads_per_request": round(server.leads / max(server.requests, 1), 1),
+        "connections": server.connections,
+        "batch_size_after": final_batch_size,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=50, help="Leads sent concurrently per burst")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent senders, like WEBHOOK_WORKERS")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Mock webhook processing time")
+    parser.add_argument("--pause-ms", type=float, default=50.0, help="Idle time between bursts")
+    parser.add_argument("--leads", type=int, default=2000, help="Leads pushed through the dispatcher")
+    parser.add_argument("--batch-size", type=int, default=25, help="Dispatcher batch size, like WEBHOOK_BATCH_SIZE")
+    parser.add_argument("--batch-ms", type=float, default=200.0, help="Dispatcher batch wait, like WEBHOOK_BATCH_MS")
+    parser.add_argument("--output", help="Write results to this JSON file as well as stdout")
+    args = parser.parse_args(argv)
+
+    server = start_mock(args.latency_ms / 1000)
+    url = f"http://127.0.0.1:{server.server_address[1]}/webhook"
+    timeout = (3.05, 10)
+    session = http_session(pool_size=args.workers)
+    modes = [
+        ("requests.post", lambda: requests.post(url, json=SAMPLE_LEAD, timeout=timeout)),
+        ("pooled", lambda: post_json(session, url, SAMPLE_LEAD, *timeout)),
+        ("pooled+gzip", lambda: post_json(session, url, SAMPLE_LEAD, *timeout, compress=True)),
+    ]
+    results = []
+    for name, send in modes:
+        result = run_mode(name, send, server, args.bursts, args.burst_size, args.workers, args.pause_ms / 1000)
+        print(json.dumps(result), flush=True)
+        results.append(result)
+
+    batch_wait = args.batch_ms / 1000
+    dispatcher_modes = [
+        ("dispatcher single", dict(batch_size=1)),
+        (f"dispatcher batch={args.batch_size}", dict(batch_size=args.batch_size)),
+        (f"dispatcher batch={args.batch_size} unsupported", dict(batch_size=args.batch_size, batching=False)),
+    ]
+    for name, options in dispatcher_modes:
+        result = run_dispatcher(name, server, url, http_session(pool_size=args.workers), args.leads, args.workers,
+                                batch_wait=batch_wait, **options)
+        print(json.dumps(result), flush=True)
+        results.append(result)
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
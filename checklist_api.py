@@ -0,0 +1,228 @@
+"""Headless progress API, CLI and HTTP endpoint for the checklist.
+
+Uses the same schema and core as app.py, without importing Streamlit, so
+dashboards and cron jobs can report on saved progress files cheaply:
+
+    python checklist_api.py report progress/*.json      # one JSON line per file
+    python checklist_api.py validate progress.json.gz   # exit status 1 if invalid
+    python checklist_api.py diff old.json new.json
+    python checklist_api.py serve --port 8502
+
+The server answers ``GET /health``, ``GET /progress/<checklist id>`` (from
+the progress store), and ``POST /report`` / ``POST /validate`` with a
+progress file (JSON, optionally gzipped) as the request body.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from checklist_core import (
+    ProgressFileError,
+    ProgressIndex,
+    SchemaError,
+    iter_progress_file,
+    load_registry,
+    open_progress_file,
+)
+
+DEFAULT_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checklist.json")
+
+
+def _counts(completed, total):
+    return {"completed": completed, "total": total, "percent": round(100 * completed / total, 1) if total else 0.0}
+
+
+def progress_report(registry, state, sections=True):
+    """Overall, per-tab and (optionally) per-section completion for a key -> bool state"""
+    index = ProgressIndex(registry, {key: bool(value) for key, value in state.items() if key in registry.index})
+    report = {
+        "overall": _counts(*index.overall()),
+        "tabs": {tab.id: {"label": tab.label, **_counts(*index.tab(tab.id))} for tab in registry.tabs},
+    }
+    if sections:
+        report["sections"] = {
+            section.id: {"label": section.progress_label, **_counts(*index.section(section.id))}
+            for section in registry.sections.values()
+        }
+    return report
+
+
+def read_progress(registry, fp, max_bytes=1_000_000, max_keys=10_000):
+    """Parse a progress stream into (state, ignored keys); raises ProgressFileError if invalid"""
+    state = {}
+    ignored = []
+    for key, value in iter_progress_file(open_progress_file(fp), max_bytes=max_bytes, max_keys=max_keys):
+        if key in registry.index:
+            state[key] = value
+        else:
+            ignored.append(key)
+    return state, ignored
+
+
+def load_progress(registry, path, **limits):
+    with open(path, "rb") as fp:
+        return read_progress(registry, fp, **limits)
+
+
+def diff_progress(registry, old, new):
+    """Items completed and uncompleted between two states; missing items count as incomplete"""
+    completed = [item.key for item in registry.items if new.get(item.key, False) and not old.get(item.key, False)]
+    uncompleted = [item.key for item in registry.items if old.get(item.key, False) and not new.get(item.key, False)]
+    return {
+        "completed": completed,
+        "uncompleted": uncompleted,
+        "overall": {"old": _counts(*ProgressIndex(registry, dict(old)).overall()),
+                    "new": _counts(*ProgressIndex(registry, dict(new)).overall())},
+    }
+
+
+class ProgressHandler(BaseHTTPRequestHandler):
+    """JSON endpoints over a registry and an optional progress store (set on the server)"""
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        registry, store = self.server.registry, self.server.store
+        if self.path == "/health":
+            self._send(HTTPStatus.OK, {"status": "ok", "items": len(registry)})
+        elif self.path.startswith("/progress/") and store is not None:
+            checklist_id = unquote(urlsplit(self.path).path[len("/progress/"):])
+            self._send(HTTPStatus.OK, progress_report(registry, store.load(checklist_id)))
+        else:
+            self._send(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path not in ("/report", "/validate"):
+            self._send(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._send(HTTPStatus.LENGTH_REQUIRED, {"error": "Content-Length required"})
+            return
+        # int() would also take signs, spaces and underscores; a negative length would read until EOF
+        if not length.isascii() or not length.isdigit():
+            self._send(HTTPStatus.BAD_REQUEST, {"error": "invalid Content-Length"})
+            return
+        length = int(length)
+        if length > self.server.max_bytes:
+            self._send(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "progress file too large"})
+            return
+        try:
+            state, ignored = read_progress(
+                self.server.registry, io.BytesIO(self.rfile.read(length)),
+                max_bytes=self.server.max_bytes, max_keys=self.server.max_keys,
+            )
+        except ProgressFileError as e:
+            self._send(HTTPStatus.BAD_REQUEST, {"valid": False, "error": str(e)})
+            return
+        if self.path == "/validate":
+            self._send(HTTPStatus.OK, {"valid": True, "keys": len(state), "ignored": ignored})
+        else:
+            self._send(HTTPStatus.OK, {**progress_report(self.server.registry, state), "ignored": len(ignored)})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(registry, host="127.0.0.1", port=8502, store=None, max_bytes=1_000_000, max_keys=10_000, verbose=False):
+    server = ThreadingHTTPServer((host, port), ProgressHandler)
+    server.registry = registry
+    server.store = store
+    server.max_bytes = max_bytes
+    server.max_keys = max_keys
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schema", default=os.environ.get("CHECKLIST_SCHEMA", DEFAULT_SCHEMA))
+    parser.add_argument("--max-bytes", type=int, default=int(os.environ.get("CHECKLIST_IMPORT_MAX_BYTES", 1_000_000)))
+    parser.add_argument("--max-keys", type=int, default=int(os.environ.get("CHECKLIST_IMPORT_MAX_KEYS", 10_000)))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    report = commands.add_parser("report", help="Print completion for each progress file")
+    report.add_argument("files", nargs="+")
+    report.add_argument("--summary", action="store_true", help="Only overall and per-tab totals")
+
+    validate = commands.add_parser("validate", help="Check progress files against the schema")
+    validate.add_argument("files", nargs="+")
+
+    diff = commands.add_parser("diff", help="Compare two progress files")
+    diff.add_argument("old")
+    diff.add_argument("new")
+
+    serve = commands.add_parser("serve", help="Serve progress reports over HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8502)
+    serve.add_argument("--store", default=os.environ.get("CHECKLIST_STORE", "sqlite"),
+                       help="Progress store for GET /progress/<id>: sqlite, memory or none")
+    serve.add_argument("--db", default=os.environ.get(
+        "CHECKLIST_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "checklist.db")))
+    serve.add_argument("--verbose", action="store_true")
+
+    args = parser.parse_args(argv)
+    try:
+        registry = load_registry(args.schema)
+    except (OSError, SchemaError) as e:
+        print(f"Cannot load schema: {e}", file=sys.stderr)
+        return 2
+    limits = {"max_bytes": args.max_bytes, "max_keys": args.max_keys}
+
+    if args.command in ("report", "validate"):
+        status = 0
+        for path in args.files:
+            try:
+                state, ignored = load_progress(registry, path, **limits)
+            except (OSError, ProgressFileError) as e:
+                status = 1
+                line = {"file": path, "valid": False, "error": str(e)}
+            else:
+                if args.command == "validate":
+                    line = {"file": path, "valid": True, "keys": len(state), "ignored": ignored}
+                else:
+                    line = {"file": path, **progress_report(registry, state, sections=not args.summary),
+                            "ignored": len(ignored)}
+            print(json.dumps(line))
+        return status
+
+    if args.command == "diff":
+        try:
+            old, _ = load_progress(registry, args.old, **limits)
+            new, _ = load_progress(registry, args.new, **limits)
+        except (OSError, ProgressFileError) as e:
+            print(f"Cannot read progress file: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps(diff_progress(registry, old, new), indent=2))
+        return 0
+
+    store = None
+    if args.store != "none":
+        # Only the store needs it; keep the other commands free of the import
+        from checklist_store import open_store
+        store = open_store(args.store, args.db)
+    server = make_server(registry, args.host, args.port, store=store, verbose=args.verbose, **limits)
+    print(f"Serving progress reports on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
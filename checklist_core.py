@@ -0,0 +1,865 @@
+"""Checklist schema loading, compilation and progress tracking.
+
+The checklist content (tabs, sections, groups and items) lives in a JSON
+schema file. It is validated and compiled into an immutable registry once,
+so the Streamlit app only has to walk the registry on each rerun.
+
+Items may declare ``depends_on`` (item keys) and a ``duration`` in days;
+a section's ``depends_on`` (section ids) makes each of its items depend on
+every item of those sections.
+"""
+import bisect
+import codecs
+import gzip
+import heapq
+import json
+import re
+import sys
+import time
+import zlib
+from array import array
+from dataclasses import dataclass
+
+
+class SchemaError(ValueError):
+    """Raised when a checklist schema is malformed"""
+
+
+@dataclass(frozen=True)
+class Item:
+    key: str
+    label: str
+    help: str
+    tab_id: str
+    section_id: str
+    index: int
+    depends_on: tuple = ()
+    duration: float = 1.0
+
+
+@dataclass(frozen=True)
+class Group:
+    subheader: str
+    heading: str
+    items: tuple
+
+
+@dataclass(frozen=True)
+class Section:
+    id: str
+    tab_id: str
+    subheader: str
+    progress_label: str
+    groups: tuple
+    items: tuple
+    depends_on: tuple = ()
+
+
+@dataclass(frozen=True)
+class Tab:
+    id: str
+    label: str
+    header: str
+    sections: tuple
+    items: tuple
+
+
+class Registry:
+    """Compiled, read-only view of a checklist schema"""
+
+    def __init__(self, tabs, version=1):
+        self.version = version
+        self.tabs = tabs
+        self.tab_index = {tab.id: tab for tab in tabs}
+        self.sections = {s.id: s for tab in tabs for s in tab.sections}
+        self.items = tuple(item for tab in tabs for item in tab.items)
+        self.index = {item.key: item for item in self.items}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def item(self, key):
+        return self.index[key]
+
+    def keys(self):
+        return [item.key for item in self.items]
+
+
+def _require(node, field, where):
+    value = node.get(field)
+    if not isinstance(value, str) or not value:
+        raise SchemaError(f"{where}: '{field}' must be a non-empty string")
+    return value
+
+
+def _optional(node, field, where):
+    value = node.get(field)
+    if value is not None and not isinstance(value, str):
+        raise SchemaError(f"{where}: '{field}' must be a string")
+    return value
+
+
+def _list(node, field, where):
+    value = node.get(field)
+    if not isinstance(value, list) or not value:
+        raise SchemaError(f"{where}: '{field}' must be a non-empty list")
+    return value
+
+
+def _names(node, field, where):
+    value = node.get(field, [])
+    if not isinstance(value, list) or not all(isinstance(name, str) and name for name in value):
+        raise SchemaError(f"{where}: '{field}' must be a list of non-empty strings")
+    return tuple(dict.fromkeys(value))
+
+
+def _duration(node, where):
+    value = node.get("duration", 1)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise SchemaError(f"{where}: 'duration' must be a non-negative number of days")
+    return float(value)
+
+
+def compile_schema(data):
+    """Validate a parsed schema document and compile it into a Registry"""
+    if not isinstance(data, dict):
+        raise SchemaError("schema: top level must be an object")
+
+    tabs = []
+    tab_ids = set()
+    section_ids = set()
+    keys = set()
+    index = 0
+
+    for t, tab_node in enumerate(_list(data, "tabs", "schema")):
+        where = f"tabs[{t}]"
+        tab_id = _require(tab_node, "id", where)
+        if tab_id in tab_ids:
+            raise SchemaError(f"{where}: duplicate tab id '{tab_id}'")
+        tab_ids.add(tab_id)
+
+        sections = []
+        for s, section_node in enumerate(_list(tab_node, "sections", where)):
+            section_where = f"{where}.sections[{s}]"
+            section_id = _require(section_node, "id", section_where)
+            if section_id in section_ids:
+                raise SchemaError(f"{section_where}: duplicate section id '{section_id}'")
+            section_ids.add(section_id)
+
+            groups = []
+            for g, group_node in enumerate(_list(section_node, "groups", section_where)):
+                group_where = f"{section_where}.groups[{g}]"
+                items = []
+                for i, item_node in enumerate(_list(group_node, "items", group_where)):
+                    item_where = f"{group_where}.items[{i}]"
+                    key = _require(item_node, "key", item_where)
+                    if key in keys:
+                        raise SchemaError(f"{item_where}: duplicate item key '{key}'")
+                    keys.add(key)
+                    items.append(Item(
+                        key=key,
+                        label=_require(item_node, "label", item_where),
+                        help=_optional(item_node, "help", item_where),
+                        tab_id=tab_id,
+                        section_id=section_id,
+                        index=index,
+                        depends_on=_names(item_node, "depends_on", item_where),
+                        duration=_duration(item_node, item_where),
+                    ))
+                    index += 1
+                groups.append(Group(
+                    subheader=_optional(group_node, "subheader", group_where),
+                    heading=_optional(group_node, "heading", group_where),
+                    items=tuple(items),
+                ))
+
+            sections.append(Section(
+                id=section_id,
+                tab_id=tab_id,
+                subheader=_optional(section_node, "subheader", section_where),
+                progress_label=_require(section_node, "progress_label", section_where),
+                groups=tuple(groups),
+                items=tuple(item for group in groups for item in group.items),
+                depends_on=_names(section_node, "depends_on", section_where),
+            ))
+
+        tabs.append(Tab(
+            id=tab_id,
+            label=_require(tab_node, "label", where),
+            header=_require(tab_node, "header", where),
+            sections=tuple(sections),
+            items=tuple(item for section in sections for item in section.items),
+        ))
+
+    registry = Registry(tuple(tabs), version=data.get("version", 1))
+    # Checks references and rejects dependency cycles
+    DependencyGraph(registry)
+    return registry
+
+
+def load_registry(path):
+    """Read a JSON schema file and compile it into a Registry"""
+    with open(path, encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise SchemaError(f"{path}: invalid JSON ({e})") from e
+    return compile_schema(data)
+
+
+class ProgressIndex:
+    """Completed counters per section, tab and overall, kept in step with item state
+
+    Totals come from the registry, so they are exact before any checkbox
+    renders. ``set`` updates the state mapping and the three counters in
+    O(1); keys that are not in the registry are stored but not counted.
+    ``version`` increases on every change and ``changed_at`` records when
+    each key last changed, so callers can cache derived data and export
+    deltas. Attached watchers (e.g. a Schedule) get ``load(state)`` and
+    ``set(key, value)`` calls as the index changes.
+    """
+
+    def __init__(self, registry, state=None):
+        self.registry = registry
+        self.state = {} if state is None else state
+        self.version = 0
+        self.watchers = []
+        self.load()
+
+    def attach(self, watcher):
+        """Keep ``watcher`` in step with this index, starting from the current state"""
+        watcher.load(self.state)
+        self.watchers.append(watcher)
+
+    def load(self, state=None):
+        """Recount every counter from scratch, optionally switching to a new state mapping"""
+        if state is not None:
+            self.state = state
+        self.version += 1
+        self.changed_at = {}
+        self.completed = 0
+        self.section_completed = dict.fromkeys(self.registry.sections, 0)
+        self.tab_completed = {tab.id: 0 for tab in self.registry.tabs}
+        for key, value in self.state.items():
+            if value and key in self.registry.index:
+                self._bump(self.registry.index[key], 1)
+        for watcher in self.watchers:
+            watcher.load(self.state)
+
+    def _bump(self, item, delta):
+        self.completed += delta
+        self.section_completed[item.section_id] += delta
+        self.tab_completed[item.tab_id] += delta
+
+    def get(self, key):
+        return bool(self.state.get(key, False))
+
+    def set(self, key, value):
+        """Store an item's value and return True if it changed"""
+        value = bool(value)
+        previous = bool(self.state.get(key, False))
+        self.state[key] = value
+        if value == previous:
+            return False
+        self.version += 1
+        self.changed_at[key] = time.time()
+        item = self.registry.index.get(key)
+        if item is not None:
+            self._bump(item, 1 if value else -1)
+        for watcher in self.watchers:
+            watcher.set(key, value)
+        return True
+
+    def update(self, values):
+        """Apply several item values and return the keys that changed"""
+        return [key for key, value in values.items() if self.set(key, value)]
+
+    def overall(self):
+        return self.completed, len(self.registry)
+
+    def section(self, section_id):
+        return self.section_completed[section_id], len(self.registry.sections[section_id].items)
+
+    def tab(self, tab_id):
+        return self.tab_completed[tab_id], len(self.registry.tab_index[tab_id].items)
+
+    def snapshot(self):
+        """Return the state as a plain key -> bool dict, as used by Export/Import"""
+        return {key: bool(value) for key, value in self.state.items()}
+
+    def changes_since(self, since):
+        """Return the current value of every key changed after the ``since`` timestamp"""
+        return {key: self.get(key) for key, changed in self.changed_at.items() if changed > since}
+
+
+class History:
+    """Undo/redo stacks of change groups, each mapping key -> (old value, new value)
+
+    A group is one user action (a toggle, an import, a reset), so undo
+    reverts it as a whole. Only the newest ``limit`` groups are kept.
+    """
+
+    def __init__(self, limit=100):
+        self.limit = limit
+        self.undo_stack = []
+        self.redo_stack = []
+
+    def record(self, changes):
+        """Push a change group and drop the redo stack"""
+        if not changes:
+            return
+        self.undo_stack.append(dict(changes))
+        del self.undo_stack[:-self.limit]
+        self.redo_stack.clear()
+
+    def undo(self):
+        """Pop the latest group and return the key -> value changes that revert it"""
+        if not self.undo_stack:
+            return {}
+        group = self.undo_stack.pop()
+        self.redo_stack.append(group)
+        return {key: old for key, (old, _) in group.items()}
+
+    def redo(self):
+        """Pop the latest undone group and return the key -> value changes that reapply it"""
+        if not self.redo_stack:
+            return {}
+        group = self.redo_stack.pop()
+        self.undo_stack.append(group)
+        return {key: new for key, (_, new) in group.items()}
+
+
+class DependencyGraph:
+    """Static task DAG compiled from the registry's ``depends_on`` declarations
+
+    Tasks are numbered by item index. ``order`` is a topological order
+    (ties broken by item index, so it is stable), and ``position`` maps a
+    task to its place in it.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        items = registry.items
+        self.durations = [item.duration for item in items]
+        self.preds = [[] for _ in items]
+        self.succs = [[] for _ in items]
+        for item in items:
+            deps = {}
+            for key in item.depends_on:
+                dep = registry.index.get(key)
+                if dep is None:
+                    raise SchemaError(f"{item.key}: depends on unknown item '{key}'")
+                deps[dep.index] = None
+            for section_id in registry.sections[item.section_id].depends_on:
+                section = registry.sections.get(section_id)
+                if section is None:
+                    raise SchemaError(f"{item.section_id}: depends on unknown section '{section_id}'")
+                deps.update(dict.fromkeys(dep.index for dep in section.items))
+            for dep in deps:
+                if dep == item.index:
+                    raise SchemaError(f"{item.key}: depends on itself")
+                self.preds[item.index].append(dep)
+                self.succs[dep].append(item.index)
+        self.edges = sum(len(preds) for preds in self.preds)
+
+        indegree = [len(preds) for preds in self.preds]
+        heap = [task for task, degree in enumerate(indegree) if degree == 0]
+        order = []
+        while heap:
+            task = heapq.heappop(heap)
+            order.append(task)
+            for succ in self.succs[task]:
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    heapq.heappush(heap, succ)
+        if len(order) < len(items):
+            stuck = [items[task].key for task, degree in enumerate(indegree) if degree]
+            raise SchemaError(f"dependency cycle among: {', '.join(stuck[:10])}")
+        self.order = order
+        self.position = [0] * len(items)
+        for position, task in enumerate(order):
+            self.position[task] = position
+
+
+class Schedule:
+    """Readiness and remaining critical path of a DependencyGraph, updated per toggle
+
+    Completed tasks take no time, so ``finish`` is the number of days left
+    on the longest remaining chain. A task is ready when it is incomplete
+    and none of its dependencies are; otherwise it is blocked. ``set`` only
+    touches the toggled task's successors, and earliest-finish changes are
+    propagated in topological order and stop where they stop changing.
+    Pass a Schedule to ``ProgressIndex.attach`` to keep it in step.
+
+    Per-task values live in typed arrays, and the max-heap of finish times
+    is rebuilt once out-of-date entries outnumber the tasks, so a session's
+    schedule stays a few bytes per task however long it runs.
+    """
+
+    def __init__(self, graph, state=None):
+        self.graph = graph
+        self.load(state or {})
+
+    def load(self, state):
+        graph = self.graph
+        self.done = bytearray(bool(state.get(item.key, False)) for item in graph.registry.items)
+        self.open_deps = array("i", (sum(not self.done[dep] for dep in preds) for preds in graph.preds))
+        self.incomplete = self.done.count(0)
+        self.ready = sum(not done and not deps for done, deps in zip(self.done, self.open_deps))
+        self.start_at = array("d", bytes(8 * len(self.done)))
+        self.finish_at = array("d", bytes(8 * len(self.done)))
+        for task in graph.order:
+            self._reschedule(task)
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(-finish, task) for task, finish in enumerate(self.finish_at)]
+        heapq.heapify(self._heap)
+
+    def _remaining(self, task):
+        return 0.0 if self.done[task] else self.graph.durations[task]
+
+    def _reschedule(self, task):
+        """Recompute a task's earliest start and finish; return True if the finish moved"""
+        preds = self.graph.preds[task]
+        start = max(self.finish_at[dep] for dep in preds) if preds else 0.0
+        finish = start + self._remaining(task)
+        self.start_at[task] = start
+        if finish == self.finish_at[task]:
+            return False
+        self.finish_at[task] = finish
+        return True
+
+    def set(self, key, value):
+        item = self.graph.registry.index.get(key)
+        if item is None or self.done[item.index] == bool(value):
+            return
+        task = item.index
+        self.done[task] = bool(value)
+        delta = -1 if value else 1
+        self.incomplete += delta
+        if not self.open_deps[task]:
+            self.ready += delta
+        for succ in self.graph.succs[task]:
+            was_ready = not self.open_deps[succ]
+            self.open_deps[succ] += delta
+            if not self.done[succ] and was_ready != (not self.open_deps[succ]):
+                self.ready -= delta
+        self._propagate(task)
+
+    def _propagate(self, task):
+        position = self.graph.position
+        queue = [(position[task], task)]
+        queued = {task}
+        while queue:
+            _, task = heapq.heappop(queue)
+            if not self._reschedule(task):
+                continue
+            heapq.heappush(self._heap, (-self.finish_at[task], task))
+            for succ in self.graph.succs[task]:
+                if succ not in queued:
+                    queued.add(succ)
+                    heapq.heappush(queue, (position[succ], succ))
+        # Each task has one current entry; the rest are out of date
+        if len(self._heap) > 2 * len(self.finish_at):
+            self._rebuild_heap()
+
+    @property
+    def blocked(self):
+        return self.incomplete - self.ready
+
+    def status(self, key):
+        task = self.graph.registry.index[key].index
+        if self.done[task]:
+            return "done"
+        return "blocked" if self.open_deps[task] else "ready"
+
+    def window(self, key):
+        """(start, finish) in days from now for an incomplete task"""
+        task = self.graph.registry.index[key].index
+        return self.start_at[task], self.finish_at[task]
+
+    @property
+    def finish(self):
+        """Days left until every task is done, along the longest dependency chain"""
+        heap = self._heap
+        # Entries are pushed on every change, so drop the ones that are out of date
+        while heap and -heap[0][0] != self.finish_at[heap[0][1]]:
+            heapq.heappop(heap)
+        return -heap[0][0] if heap else 0.0
+
+    def critical_path(self):
+        """Incomplete tasks on the longest remaining chain, first to last"""
+        finish = self.finish
+        if not finish:
+            return []
+        task = self._heap[0][1]
+        path = []
+        while True:
+            if not self.done[task]:
+                path.append(task)
+            preds = self.graph.preds[task]
+            start = self.start_at[task]
+            if not preds or start <= 0:
+                break
+            # Follow the dependency that determines the start; lowest position breaks ties
+            task = min((dep for dep in preds if self.finish_at[dep] == start), key=self.graph.position.__getitem__)
+        items = self.graph.registry.items
+        return [items[task] for task in reversed(path)]
+
+
+# Export formats: name -> (label, file extension, MIME type)
+EXPORT_FORMATS = {
+    "json": ("JSON", ".json", "application/json"),
+    "compact": ("Compact JSON", ".json", "application/json"),
+    "gzip": ("Gzipped JSON", ".json.gz", "application/gzip"),
+}
+
+
+def serialize_progress(values, fmt="json"):
+    """Encode a key -> bool progress dict in one of the EXPORT_FORMATS"""
+    if fmt == "json":
+        return json.dumps(values, indent=2).encode("utf-8")
+    compact = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    if fmt == "compact":
+        return compact
+    if fmt == "gzip":
+        return gzip.compress(compact, mtime=0)
+    raise ValueError(f"Unknown export format '{fmt}'")
+
+
+class BitsetState:
+    """Compact item state: one bit per registry item, packed into a single int
+
+    The registry acts as the item-index table shared by every session, so a
+    session only pays for the bitmask itself. Supports the mapping operations
+    ProgressIndex and the app use; keys outside the registry are dropped.
+    """
+
+    __slots__ = ("registry", "bits")
+
+    def __init__(self, registry, bits=0):
+        self.registry = registry
+        self.bits = bits
+
+    @classmethod
+    def from_dict(cls, registry, values):
+        state = cls(registry)
+        for key, value in values.items():
+            state[key] = value
+        return state
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __contains__(self, key):
+        return key in self.registry.index
+
+    def __getitem__(self, key):
+        return bool(self.bits >> self.registry.index[key].index & 1)
+
+    def __setitem__(self, key, value):
+        item = self.registry.index.get(key)
+        if item is None:
+            return
+        if value:
+            self.bits |= 1 << item.index
+        else:
+            self.bits &= ~(1 << item.index)
+
+    def get(self, key, default=None):
+        item = self.registry.index.get(key)
+        if item is None:
+            return default
+        return bool(self.bits >> item.index & 1)
+
+    def __iter__(self):
+        return iter(self.registry.keys())
+
+    def __len__(self):
+        return len(self.registry)
+
+    def keys(self):
+        return self.registry.keys()
+
+    def values(self):
+        return [bool(self.bits >> item.index & 1) for item in self.registry.items]
+
+    def items(self):
+        bits = self.bits
+        return [(item.key, bool(bits >> item.index & 1)) for item in self.registry.items]
+
+
+def state_memory(state):
+    """Estimate the bytes a session spends on its item state, excluding shared key strings"""
+    if isinstance(state, BitsetState):
+        return sys.getsizeof(state) + sys.getsizeof(state.bits)
+    return sys.getsizeof(state)
+
+
+def compact_savings(registry, state):
+    """Compare a state's footprint as a key -> bool dict and as a BitsetState"""
+    values = state.to_dict() if isinstance(state, BitsetState) else dict(state)
+    full = {key: values.get(key, False) for key in registry.keys()}
+    dict_bytes = state_memory(full)
+    compact_bytes = state_memory(BitsetState.from_dict(registry, full))
+    return {
+        "dict_bytes": dict_bytes,
+        "compact_bytes": compact_bytes,
+        "saved_bytes": dict_bytes - compact_bytes,
+    }
+
+
+class ProgressFileError(ValueError):
+    """Raised when a progress file is malformed or exceeds the import limits"""
+
+
+_WHITESPACE = " \t\n\r"
+_LITERALS = {"true": True, "false": False}
+
+
+def iter_progress_file(fp, max_bytes=1_000_000, max_keys=10_000, chunk_size=65536):
+    """Yield (key, value) pairs from a JSON progress object, reading it in chunks
+
+    Only a flat object of string keys to true/false is accepted. The file is
+    never held in memory as a whole, and reading stops with a
+    ProgressFileError as soon as ``max_bytes`` or ``max_keys`` is exceeded.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buf = ""
+    pos = 0
+    read = 0
+    eof = False
+
+    def more():
+        nonlocal buf, pos, read, eof
+        if eof:
+            return False
+        try:
+            chunk = fp.read(chunk_size)
+        except (OSError, EOFError, zlib.error) as e:
+            raise ProgressFileError(f"Could not read progress file: {e}") from e
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        read += len(chunk)
+        if read > max_bytes:
+            raise ProgressFileError(f"Progress file is larger than {max_bytes} bytes")
+        if not chunk:
+            eof = True
+        try:
+            text = decoder.decode(chunk, final=eof)
+        except UnicodeDecodeError as e:
+            raise ProgressFileError("Progress file is not valid UTF-8") from e
+        buf = buf[pos:] + text
+        pos = 0
+        return True
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or not more():
+                return
+
+    def expect(chars):
+        nonlocal pos
+        skip_ws()
+        if pos >= len(buf) or buf[pos] not in chars:
+            found = repr(buf[pos]) if pos < len(buf) else "end of file"
+            raise ProgressFileError(f"Expected {' or '.join(repr(c) for c in chars)}, found {found}")
+        pos += 1
+        return buf[pos - 1]
+
+    def read_key():
+        nonlocal pos
+        while True:
+            try:
+                key, end = json.decoder.scanstring(buf, pos)
+            except json.JSONDecodeError as e:
+                if more():
+                    continue
+                raise ProgressFileError(f"Invalid key: {e.msg}") from e
+            pos = end
+            return key
+
+    def read_value():
+        nonlocal pos
+        skip_ws()
+        while len(buf) - pos < 5 and not eof:
+            more()
+        for literal, value in _LITERALS.items():
+            if buf.startswith(literal, pos):
+                pos += len(literal)
+                return value
+        raise ProgressFileError(f"Values must be true or false, found {buf[pos:pos + 10]!r}")
+
+    more()
+    expect("{")
+    skip_ws()
+    if pos < len(buf) and buf[pos] == "}":
+        pos += 1
+    else:
+        count = 0
+        while True:
+            expect('"')
+            key = read_key()
+            expect(":")
+            value = read_value()
+            count += 1
+            if count > max_keys:
+                raise ProgressFileError(f"Progress file has more than {max_keys} keys")
+            yield key, value
+            if expect(",}") == "}":
+                break
+    skip_ws()
+    if pos < len(buf):
+        raise ProgressFileError(f"Unexpected data after the progress object: {buf[pos:pos + 10]!r}")
+
+
+def open_progress_file(fp):
+    """Return a readable stream for a progress file, transparently un-gzipping it"""
+    magic = fp.read(2)
+    fp.seek(0)
+    if magic == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=fp, mode="rb")
+    return fp
+
+
+@dataclass
+class ImportDiff:
+    """What applying an imported progress file would change"""
+
+    added: dict
+    changed: dict
+    unchanged: int
+    ignored: list
+
+    @property
+    def changes(self):
+        return {**self.added, **self.changed}
+
+    def __bool__(self):
+        return bool(self.added or self.changed)
+
+
+def diff_import(registry, state, pairs):
+    """Compare imported (key, value) pairs with the current state
+
+    Keys missing from the state count as unchecked, so the result is the
+    same for a plain dict and a BitsetState. Items the import checks are
+    reported as added, items it unchecks as changed, and keys that are not
+    in the registry as ignored.
+    """
+    imported = {}
+    ignored = {}
+    for key, value in pairs:
+        if key in registry.index:
+            imported[key] = value
+        else:
+            ignored[key] = None
+
+    added = {}
+    changed = {}
+    unchanged = 0
+    for key, value in imported.items():
+        if bool(state.get(key, False)) == bool(value):
+            unchanged += 1
+        elif value:
+            added[key] = value
+        else:
+            changed[key] = value
+    return ImportDiff(added=added, changed=changed, unchanged=unchanged, ignored=list(ignored))
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class SearchIndex:
+    """Inverted index over task labels and help texts
+
+    Built once per registry. Query terms of two or more characters match
+    as prefixes, shorter ones exactly. For a prefix, the sorted vocabulary
+    is bisected to find the matching terms, whose postings are merged into
+    a sorted id list (cached per prefix). A query walks the shortest list
+    in checklist order, checks the remaining terms against each
+    candidate's own tokens, and stops as soon as ``limit`` results are
+    found.
+    """
+
+    CACHE_SIZE = 4096
+    MIN_PREFIX = 2
+
+    def __init__(self, registry):
+        self.registry = registry
+        postings = {}
+        self.item_tokens = []
+        for item in registry.items:
+            tokens = tuple(set(tokenize(item.label) + tokenize(item.help)))
+            self.item_tokens.append(tokens)
+            for token in tokens:
+                postings.setdefault(token, []).append(item.index)
+        self.vocabulary = sorted(postings)
+        self.postings = postings
+        self._prefix_cache = {}
+
+    def _prefix(self, prefix):
+        """Sorted ids of the items with a term starting with ``prefix``"""
+        if len(prefix) < self.MIN_PREFIX:
+            # Single characters would expand to most of the vocabulary; match them exactly
+            return self.postings.get(prefix, [])
+        ordered = self._prefix_cache.get(prefix)
+        if ordered is None:
+            start = bisect.bisect_left(self.vocabulary, prefix)
+            stop = bisect.bisect_left(self.vocabulary, prefix + "\uffff", start)
+            tokens = self.vocabulary[start:stop]
+            if len(tokens) == 1:
+                ordered = self.postings[tokens[0]]
+            else:
+                ordered = sorted(set().union(*(self.postings[token] for token in tokens)))
+            if len(self._prefix_cache) >= self.CACHE_SIZE:
+                self._prefix_cache.clear()
+            self._prefix_cache[prefix] = ordered
+        return ordered
+
+    def _has_term(self, tokens, term):
+        if len(term) < self.MIN_PREFIX:
+            return term in tokens
+        return any(token.startswith(term) for token in tokens)
+
+    def search(self, query, progress=None, incomplete_only=False, tab_id=None, section_id=None, limit=None):
+        """Return matching items in checklist order
+
+        ``incomplete_only`` needs a ProgressIndex (or any object with
+        ``get(key)``) passed as ``progress``.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        terms = sorted(terms, key=lambda term: len(self._prefix(term)))
+        ordered = self._prefix(terms[0])
+        others = terms[1:]
+        results = []
+        for index in ordered:
+            if others:
+                tokens = self.item_tokens[index]
+                if not all(self._has_term(tokens, term) for term in others):
+                    continue
+            item = self.registry.items[index]
+            if tab_id is not None and item.tab_id != tab_id:
+                continue
+            if section_id is not None and item.section_id != section_id:
+                continue
+            if incomplete_only and progress.get(item.key):
+                continue
+            results.append(item)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,112 @@
+"""Opt-in rerun profiler for the checklist app.
+
+A profiler records named spans for one rerun at a time (a full script run
+or a single fragment rerun), keeps the most recent records for the debug
+panel and appends each record to a JSONL trace file shared by all
+sessions. Once the trace file grows past ``trace_max_bytes`` it is rotated
+to ``<path>.1``, so at most two files' worth of records are kept on disk.
+NULL_PROFILER has the same interface and does nothing, so the
+app can call it unconditionally.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+_trace_lock = threading.Lock()
+
+
+class RerunProfiler:
+    """Collects span timings per rerun and keeps a short history"""
+
+    enabled = True
+
+    def __init__(self, trace_path=None, history=20, trace_max_bytes=10_000_000):
+        self.trace_path = trace_path
+        self.trace_max_bytes = trace_max_bytes
+        self.records = deque(maxlen=history)
+        self.cause = "initial"
+        self._current = None
+
+    def set_cause(self, cause):
+        """Record what triggered the next rerun, e.g. from a widget callback"""
+        self.cause = cause
+
+    def begin(self, scope):
+        self._current = {
+            "ts": time.time(),
+            "scope": scope,
+            "cause": self.cause,
+            "widgets": 0,
+            "spans": {},
+            "_start": time.perf_counter(),
+        }
+        self.cause = "rerun"
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._current is not None:
+                total, count = self._current["spans"].get(name, (0.0, 0))
+                self._current["spans"][name] = (total + time.perf_counter() - start, count + 1)
+
+    def count_widgets(self, n=1):
+        if self._current is not None:
+            self._current["widgets"] += n
+
+    def finish(self, **extra):
+        """Close the current rerun record, store it and append it to the trace file"""
+        record, self._current = self._current, None
+        if record is None:
+            return None
+        record["total_ms"] = round((time.perf_counter() - record.pop("_start")) * 1000, 3)
+        record["spans"] = {
+            name: {"ms": round(total * 1000, 3), "calls": count}
+            for name, (total, count) in record["spans"].items()
+        }
+        record.update(extra)
+        self.records.append(record)
+        if self.trace_path:
+            line = json.dumps(record)
+            with _trace_lock:
+                self._rotate_trace()
+                with open(self.trace_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        return record
+
+    def _rotate_trace(self):
+        """Move a full trace file aside to ``<path>.1``, replacing the previous one"""
+        try:
+            full = os.path.getsize(self.trace_path) >= self.trace_max_bytes
+        except OSError:
+            return
+        if full:
+            os.replace(self.trace_path, self.trace_path + ".1")
+
+
+class _NullProfiler:
+    enabled = False
+    records = ()
+
+    def set_cause(self, cause):
+        pass
+
+    def begin(self, scope):
+        pass
+
+    def span(self, name):
+        return nullcontext()
+
+    def count_widgets(self, n=1):
+        pass
+
+    def finish(self, **extra):
+        return None
+
+
+NULL_PROFILER = _NullProfiler()
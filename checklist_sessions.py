@@ -0,0 +1,135 @@
+"""Per-session checklist data with idle eviction.
+
+Streamlit keeps every session's state in the server process for as long as
+the browser tab stays open. The app keeps its heavy per-session objects
+(progress state, indexes, undo history, export cache) in a record owned by
+a process-wide SessionManager instead; session state only holds a small
+handle. Sessions idle for longer than ``ttl`` seconds, and the least
+recently used ones beyond ``max_live``, are spilled: their record drops
+its data, which is safe because every change is already in the progress
+store. The next rerun of that session rehydrates from the store.
+
+Sweeps piggyback on reruns (at most every ``sweep_interval`` seconds), so
+there is no extra thread. Records disappear when Streamlit drops the
+session and its handle is garbage collected.
+"""
+import threading
+import time
+import uuid
+import weakref
+
+
+class SessionHandle:
+    """Stored in st.session_state; identifies the session's record"""
+
+    __slots__ = ("token", "__weakref__")
+
+    def __init__(self):
+        self.token = uuid.uuid4().hex
+
+
+class SessionRecord:
+    __slots__ = ("key", "data", "size", "last_seen", "spills")
+
+    def __init__(self):
+        self.key = None
+        self.data = None
+        self.size = 0
+        self.last_seen = 0.0
+        self.spills = 0
+
+    @property
+    def spilled(self):
+        return self.data is None and self.spills > 0
+
+
+class SessionManager:
+    """Tracks per-session data size and spills idle sessions
+
+    With ``can_spill=False`` (no persistent store) sessions are only
+    tracked, since dropping their data would lose progress.
+    """
+
+    def __init__(self, ttl=1800, max_live=0, sweep_interval=30, can_spill=True):
+        self.ttl = ttl
+        self.max_live = max_live
+        self.sweep_interval = sweep_interval
+        self.can_spill = can_spill
+        self._records = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def checkout(self, handle, key, loader):
+        """Return ``(data, loaded)`` for a session, calling ``loader()`` if it has none for ``key``
+
+        ``key`` identifies what the data was loaded for (e.g. the checklist
+        id); a different key or a spilled record reloads.
+        """
+        now = time.time()
+        with self._lock:
+            record = self._records.get(handle.token)
+            if record is None:
+                record = self._records[handle.token] = SessionRecord()
+                weakref.finalize(handle, self._forget, handle.token)
+            record.last_seen = now
+            data = record.data if record.key == key else None
+        loaded = data is None
+        if loaded:
+            data = loader()
+            with self._lock:
+                record.key, record.data = key, data
+        self._maybe_sweep(now)
+        return data, loaded
+
+    def track(self, handle, size):
+        """Record the approximate size in bytes of a session's data"""
+        with self._lock:
+            record = self._records.get(handle.token)
+            if record is not None:
+                record.size = size
+
+    def _forget(self, token):
+        with self._lock:
+            self._records.pop(token, None)
+
+    def _maybe_sweep(self, now):
+        if not self.can_spill:
+            return
+        over_cap = self.max_live and self.live > self.max_live
+        if over_cap or now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+
+    def sweep(self, now=None):
+        """Spill sessions idle past the TTL, then the least recently used beyond max_live"""
+        if not self.can_spill:
+            return 0
+        now = time.time() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            live = [record for record in self._records.values() if record.data is not None]
+            victims = [record for record in live if now - record.last_seen > self.ttl]
+            if self.max_live and len(live) - len(victims) > self.max_live:
+                expired = set(victims)
+                remaining = sorted((record for record in live if record not in expired), key=lambda r: r.last_seen)
+                victims += remaining[:len(remaining) - self.max_live]
+            for record in victims:
+                record.data = None
+                record.size = 0
+                record.spills += 1
+        return len(victims)
+
+    @property
+    def live(self):
+        with self._lock:
+            return sum(1 for record in self._records.values() if record.data is not None)
+
+    def stats(self):
+        """Counts of live and spilled sessions and the tracked bytes of the live ones"""
+        with self._lock:
+            records = list(self._records.values())
+        live = [record for record in records if record.data is not None]
+        return {
+            "live": len(live),
+            "spilled": sum(1 for record in records if record.spilled),
+            "live_bytes": sum(record.size for record in live),
+        }
@@ -0,0 +1,525 @@
+"""Persistent storage backends for checklist progress.
+
+A store maps a checklist id to its key -> bool progress. ``save`` never
+blocks on disk: changes are coalesced in memory and written by a
+background thread in batched transactions (write-behind).
+
+Checklists can be scoped to a tenant and project. ``project_checklist``
+returns the checklist id for a (tenant, project) pair, and ``rollup``
+aggregates completion per section across all of a tenant's projects.
+
+Every saved change is also appended to an event log, so ``state_at``
+can replay a checklist to any point in time. The SQLite backend writes
+a snapshot every ``snapshot_every`` events to keep replay bounded.
+"""
+import atexit
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCOPE_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# What caused a logged change; stored as the index into this tuple
+EVENT_KINDS = ("set", "import", "reset", "undo", "redo")
+
+
+def scoped_checklist_id(tenant, project):
+    """Return the checklist id for a tenant's project, validating both names"""
+    for kind, name in (("tenant", tenant), ("project", project)):
+        if not isinstance(name, str) or not SCOPE_NAME.match(name):
+            raise ValueError(f"Invalid {kind} name {name!r}: use 1-64 letters, digits, '_' or '-'")
+    return f"{tenant}/{project}"
+
+
+class ProgressStore:
+    """Interface for progress backends"""
+
+    def load(self, checklist_id):
+        """Return the saved key -> bool progress for a checklist"""
+        raise NotImplementedError
+
+    def save(self, checklist_id, changes, kind="set"):
+        """Record changed item values for a checklist and log them as events of ``kind``"""
+        raise NotImplementedError
+
+    def history_bounds(self, checklist_id):
+        """Return the (first, last) event timestamps for a checklist, or None"""
+        raise NotImplementedError
+
+    def state_at(self, checklist_id, when):
+        """Replay the event log and return the key -> bool progress as of ``when``"""
+        raise NotImplementedError
+
+    def changes_since(self, checklist_id, since):
+        """Return the latest value of every key logged after the ``since`` timestamp"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Block until every recorded change is durable"""
+
+    def close(self):
+        self.flush()
+
+    def sync_tasks(self, registry):
+        """Record which tab and section each task belongs to, for rollups"""
+        raise NotImplementedError
+
+    def project_checklist(self, tenant, project):
+        """Register a tenant's project if needed and return its checklist id"""
+        raise NotImplementedError
+
+    def projects(self, tenant):
+        """List a tenant's project names"""
+        raise NotImplementedError
+
+    def rollup(self, tenant):
+        """Return completed and total counts per (project, section) for a tenant
+
+        Rows are dicts with project, section_id, completed and total keys.
+        """
+        raise NotImplementedError
+
+
+class MemoryStore(ProgressStore):
+    """Process-local store, useful for tests and ephemeral deployments"""
+
+    def __init__(self):
+        self._data = {}
+        self._tasks = {}
+        self._projects = {}
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def load(self, checklist_id):
+        with self._lock:
+            return dict(self._data.get(checklist_id, {}))
+
+    def save(self, checklist_id, changes, kind="set"):
+        now = time.time()
+        with self._lock:
+            self._data.setdefault(checklist_id, {}).update(
+                (key, bool(value)) for key, value in changes.items()
+            )
+            self._events.setdefault(checklist_id, []).extend(
+                (now, key, bool(value), kind) for key, value in changes.items()
+            )
+
+    def history_bounds(self, checklist_id):
+        with self._lock:
+            events = self._events.get(checklist_id)
+            return (events[0][0], events[-1][0]) if events else None
+
+    def state_at(self, checklist_id, when):
+        with self._lock:
+            events = list(self._events.get(checklist_id, ()))
+        state = {}
+        for ts, key, value, _ in events:
+            if ts > when:
+                break
+            state[key] = value
+        return state
+
+    def changes_since(self, checklist_id, since):
+        with self._lock:
+            events = list(self._events.get(checklist_id, ()))
+        return {key: value for ts, key, value, _ in events if ts > since}
+
+    def sync_tasks(self, registry):
+        with self._lock:
+            self._tasks = {item.key: item.section_id for item in registry.items}
+
+    def project_checklist(self, tenant, project):
+        checklist_id = scoped_checklist_id(tenant, project)
+        with self._lock:
+            self._projects.setdefault(tenant, {})[project] = checklist_id
+        return checklist_id
+
+    def projects(self, tenant):
+        with self._lock:
+            return sorted(self._projects.get(tenant, {}))
+
+    def rollup(self, tenant):
+        with self._lock:
+            totals = {}
+            for section_id in self._tasks.values():
+                totals[section_id] = totals.get(section_id, 0) + 1
+            rows = []
+            for project, checklist_id in sorted(self._projects.get(tenant, {}).items()):
+                state = self._data.get(checklist_id, {})
+                completed = dict.fromkeys(totals, 0)
+                for key, value in state.items():
+                    if value and key in self._tasks:
+                        completed[self._tasks[key]] += 1
+                rows.extend(
+                    {"project": project, "section_id": section_id, "completed": completed[section_id], "total": total}
+                    for section_id, total in sorted(totals.items())
+                )
+            return rows
+
+
+class SQLiteStore(ProgressStore):
+    """SQLite store in WAL mode with a write-behind queue
+
+    Calls to ``save`` only update an in-memory pending map, so repeated
+    toggles of the same item collapse into one row write. A writer thread
+    waits ``flush_interval`` seconds after the first pending change, then
+    writes the whole batch in a single transaction.
+
+    Events are queued alongside and appended in the same transaction. Keys
+    and checklist ids are interned in a symbols table, so an event row is a
+    handful of integers. Snapshots are gzipped JSON lists of the completed
+    keys; the first event of a checklist also snapshots its existing
+    progress, so progress saved before the log existed replays correctly.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS progress (
+            checklist_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (checklist_id, key)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS checklists (
+            checklist_id TEXT PRIMARY KEY,
+            tenant TEXT NOT NULL,
+            project TEXT NOT NULL,
+            created_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE UNIQUE INDEX IF NOT EXISTS checklists_tenant_project ON checklists (tenant, project);
+        CREATE TABLE IF NOT EXISTS tasks (
+            key TEXT PRIMARY KEY,
+            tab_id TEXT NOT NULL,
+            section_id TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS tasks_section ON tasks (section_id);
+        CREATE TABLE IF NOT EXISTS symbols (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS events (
+            seq INTEGER PRIMARY KEY,
+            log_id INTEGER NOT NULL,
+            ts REAL NOT NULL,
+            key_id INTEGER NOT NULL,
+            value INTEGER NOT NULL,
+            kind INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS events_log_seq ON events (log_id, seq);
+        CREATE INDEX IF NOT EXISTS events_log_ts ON events (log_id, ts);
+        CREATE TABLE IF NOT EXISTS snapshots (
+            log_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            ts REAL NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (log_id, seq)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path, flush_interval=0.25, snapshot_every=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self._pending = {}
+        self._events = []
+        # Events the writer has taken but not committed yet
+        self._writing_events = []
+        self._symbols = {}
+        self._since_snapshot = {}
+        self._cond = threading.Condition()
+        self._writing = False
+        self._closed = False
+        self._read_lock = threading.Lock()
+        self._reader = self._connect()
+        self._reader.executescript(self.SCHEMA)
+        self._writer = threading.Thread(target=self._run, name="checklist-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def load(self, checklist_id):
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT key, value FROM progress WHERE checklist_id = ?", (checklist_id,)
+            ).fetchall()
+        state = {key: bool(value) for key, value in rows}
+        # Overlay changes the writer has not flushed yet
+        with self._cond:
+            for (pending_id, key), (value, _) in self._pending.items():
+                if pending_id == checklist_id:
+                    state[key] = value
+        return state
+
+    def sync_tasks(self, registry):
+        rows = [(item.key, item.tab_id, item.section_id) for item in registry.items]
+        with self._read_lock:
+            self._reader.execute("BEGIN")
+            self._reader.execute("DELETE FROM tasks")
+            self._reader.executemany("INSERT INTO tasks (key, tab_id, section_id) VALUES (?, ?, ?)", rows)
+            self._reader.execute("COMMIT")
+
+    def project_checklist(self, tenant, project):
+        checklist_id = scoped_checklist_id(tenant, project)
+        with self._read_lock:
+            self._reader.execute(
+                "INSERT OR IGNORE INTO checklists (checklist_id, tenant, project, created_at) VALUES (?, ?, ?, ?)",
+                (checklist_id, tenant, project, time.time()),
+            )
+        return checklist_id
+
+    def projects(self, tenant):
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT project FROM checklists WHERE tenant = ? ORDER BY project", (tenant,)
+            ).fetchall()
+        return [project for project, in rows]
+
+    def rollup(self, tenant):
+        # Aggregated in SQL; reflects writes flushed so far (at most flush_interval behind)
+        with self._read_lock:
+            rows = self._reader.execute(
+                """
+                SELECT c.project, t.section_id, t.total, COALESCE(SUM(p.value), 0)
+                FROM checklists AS c
+                CROSS JOIN (SELECT section_id, COUNT(*) AS total FROM tasks GROUP BY section_id) AS t
+                LEFT JOIN tasks AS k ON k.section_id = t.section_id
+                LEFT JOIN progress AS p ON p.checklist_id = c.checklist_id AND p.key = k.key
+                WHERE c.tenant = ?
+                GROUP BY c.project, t.section_id
+                ORDER BY c.project, t.section_id
+                """,
+                (tenant,),
+            ).fetchall()
+        return [
+            {"project": project, "section_id": section_id, "completed": completed, "total": total}
+            for project, section_id, total, completed in rows
+        ]
+
+    def save(self, checklist_id, changes, kind="set"):
+        if not changes:
+            return
+        now = time.time()
+        kind_id = EVENT_KINDS.index(kind)
+        with self._cond:
+            for key, value in changes.items():
+                self._pending[(checklist_id, key)] = (bool(value), now)
+                self._events.append((checklist_id, now, key, bool(value), kind_id))
+            self._cond.notify_all()
+
+    def _queued_events(self, checklist_id):
+        """(ts, key, value) of a checklist's events not committed yet, oldest first
+
+        Read them before querying the table: a batch committed in between
+        then shows up in both, rather than in neither.
+        """
+        with self._cond:
+            return [
+                (ts, key, value)
+                for pending_id, ts, key, value, _ in self._writing_events + self._events
+                if pending_id == checklist_id
+            ]
+
+    def history_bounds(self, checklist_id):
+        # Doesn't wait for the writer: queued events are merged in. Each bound is one seek on events_log_ts.
+        stamps = [ts for ts, _, _ in self._queued_events(checklist_id)]
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT (SELECT MIN(ts) FROM events WHERE log_id = s.id), "
+                "(SELECT MAX(ts) FROM events WHERE log_id = s.id) FROM symbols AS s WHERE s.name = ?",
+                (checklist_id,),
+            ).fetchone()
+        if row is not None:
+            stamps.extend(ts for ts in row if ts is not None)
+        return (min(stamps), max(stamps)) if stamps else None
+
+    def state_at(self, checklist_id, when):
+        # Like history_bounds, overlays queued events instead of flushing, so viewing past
+        # progress doesn't turn every click into its own transaction
+        queued = [event for event in self._queued_events(checklist_id) if event[0] <= when]
+        state = self._replay(checklist_id, when, bool(queued))
+        for _, key, value in queued:
+            state[key] = value
+        return state
+
+    def changes_since(self, checklist_id, since):
+        queued = [event for event in self._queued_events(checklist_id) if event[0] > since]
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT k.name, e.value FROM symbols AS s JOIN events AS e ON e.log_id = s.id "
+                "JOIN symbols AS k ON k.id = e.key_id WHERE s.name = ? AND e.ts > ? ORDER BY e.seq",
+                (checklist_id, since),
+            ).fetchall()
+        changes = {key: bool(value) for key, value in rows}
+        changes.update((key, value) for _, key, value in queued)
+        return changes
+
+    def _replay(self, checklist_id, when, queued):
+        """Committed progress as of ``when``; ``queued`` says the checklist has uncommitted events up to then"""
+        with self._read_lock:
+            log = self._reader.execute("SELECT id FROM symbols WHERE name = ?", (checklist_id,)).fetchone()
+            if log is None:
+                if not queued:
+                    return {}
+                # The first events aren't written yet; their baseline is the progress saved before the log
+                rows = self._reader.execute(
+                    "SELECT key FROM progress WHERE checklist_id = ? AND value = 1", (checklist_id,)
+                ).fetchall()
+                return dict.fromkeys((key for key, in rows), True)
+            snapshot = self._reader.execute(
+                "SELECT seq, data FROM snapshots WHERE log_id = ? AND ts <= ? ORDER BY seq DESC LIMIT 1",
+                (log[0], when),
+            ).fetchone()
+            seq, state = 0, {}
+            if snapshot is not None:
+                seq = snapshot[0]
+                state = dict.fromkeys(json.loads(gzip.decompress(snapshot[1])), True)
+            rows = self._reader.execute(
+                "SELECT s.name, e.value FROM events AS e JOIN symbols AS s ON s.id = e.key_id "
+                "WHERE e.log_id = ? AND e.seq > ? AND e.ts <= ? ORDER BY e.seq",
+                (log[0], seq, when),
+            ).fetchall()
+        for key, value in rows:
+            state[key] = bool(value)
+        return state
+
+    def flush(self):
+        with self._cond:
+            while (self._pending or self._events or self._writing) and self._writer.is_alive():
+                self._cond.notify_all()
+                self._cond.wait(0.05)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        with self._read_lock:
+            self._reader.close()
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while True:
+                with self._cond:
+                    while not self._pending and not self._closed:
+                        self._cond.wait()
+                    if not self._pending and self._closed:
+                        return
+                    # Let a burst of clicks accumulate before writing
+                    if not self._closed:
+                        self._cond.wait(self.flush_interval)
+                    batch, self._pending = self._pending, {}
+                    events, self._events = self._events, []
+                    self._writing_events = events
+                    self._writing = True
+                failed = False
+                try:
+                    self._write(conn, batch, events)
+                except sqlite3.Error:
+                    failed = True
+                    # Symbol ids and snapshot counters may belong to the rolled-back transaction
+                    self._symbols.clear()
+                    self._since_snapshot.clear()
+                with self._cond:
+                    if failed:
+                        # Requeue the batch without clobbering newer changes, then retry
+                        for pending_key, pending_value in batch.items():
+                            self._pending.setdefault(pending_key, pending_value)
+                        self._events[:0] = events
+                    self._writing_events = []
+                    self._writing = False
+                    self._cond.notify_all()
+                    if failed and not self._closed:
+                        self._cond.wait(1.0)
+                if failed and self._closed:
+                    return
+        finally:
+            conn.close()
+
+    def _symbol(self, conn, name):
+        symbol = self._symbols.get(name)
+        if symbol is None:
+            conn.execute("INSERT OR IGNORE INTO symbols (name) VALUES (?)", (name,))
+            symbol = conn.execute("SELECT id FROM symbols WHERE name = ?", (name,)).fetchone()[0]
+            self._symbols[name] = symbol
+        return symbol
+
+    def _snapshot(self, conn, checklist_id, log_id, seq, ts):
+        keys = [key for key, in conn.execute(
+            "SELECT key FROM progress WHERE checklist_id = ? AND value = 1 ORDER BY key", (checklist_id,)
+        )]
+        data = gzip.compress(json.dumps(keys, separators=(",", ":")).encode("utf-8"), mtime=0)
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots (log_id, seq, ts, data) VALUES (?, ?, ?, ?)", (log_id, seq, ts, data)
+        )
+        self._since_snapshot[log_id] = 0
+
+    def _log_events(self, conn, events):
+        """Append events; call before the progress upsert so baselines see the prior state"""
+        logs = {}
+        for checklist_id, ts, key, value, kind_id in events:
+            log_id = self._symbol(conn, checklist_id)
+            if log_id not in self._since_snapshot:
+                last = conn.execute("SELECT MAX(seq) FROM snapshots WHERE log_id = ?", (log_id,)).fetchone()[0]
+                if last is None:
+                    # Baseline snapshot of the progress saved before this log's first event
+                    self._snapshot(conn, checklist_id, log_id, 0, ts - 1e-6)
+                else:
+                    self._since_snapshot[log_id] = conn.execute(
+                        "SELECT COUNT(*) FROM events WHERE log_id = ? AND seq > ?", (log_id, last)
+                    ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO events (log_id, ts, key_id, value, kind) VALUES (?, ?, ?, ?, ?)",
+                (log_id, ts, self._symbol(conn, key), int(value), kind_id),
+            )
+            self._since_snapshot[log_id] += 1
+            logs[log_id] = (checklist_id, ts)
+        return logs
+
+    def _write(self, conn, batch, events):
+        rows = [
+            (checklist_id, key, int(value), updated_at)
+            for (checklist_id, key), (value, updated_at) in batch.items()
+        ]
+        conn.execute("BEGIN")
+        try:
+            logs = self._log_events(conn, events)
+            conn.executemany(
+                "INSERT INTO progress (checklist_id, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (checklist_id, key) DO UPDATE SET value = excluded.value, "
+                "updated_at = excluded.updated_at",
+                rows,
+            )
+            for log_id, (checklist_id, ts) in logs.items():
+                if self._since_snapshot[log_id] >= self.snapshot_every:
+                    seq = conn.execute("SELECT MAX(seq) FROM events WHERE log_id = ?", (log_id,)).fetchone()[0]
+                    self._snapshot(conn, checklist_id, log_id, seq, ts)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            logger.exception("Failed to write %d progress rows to %s", len(rows), self.path)
+            conn.execute("ROLLBACK")
+            raise
+
+
+def open_store(backend="sqlite", path="checklist.db", **options):
+    """Create a progress store by backend name ('sqlite' or 'memory')"""
+    if backend == "sqlite":
+        store = SQLiteStore(os.path.abspath(path), **options)
+    elif backend == "memory":
+        store = MemoryStore()
+    else:
+        raise ValueError(f"Unknown progress store backend '{backend}'")
+    atexit.register(store.close)
+    return store
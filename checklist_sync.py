@@ -0,0 +1,90 @@
+"""In-process pub/sub for checklists shared by several sessions.
+
+Sessions working on the same checklist subscribe to it on a SyncBus.
+Publishing a change assigns it the next sequence number on the bus and
+pushes the item-level diff into every other subscriber's inbox; nothing
+is reloaded from the store. Concurrent toggles of the same item resolve
+to the value with the highest sequence number: a subscriber drops any
+incoming diff for a key it has already seen a newer sequence for, so
+every session converges on the same state regardless of how its own
+optimistic changes interleave with deliveries.
+
+The bus lives in one process, like Streamlit's session state; it has the
+same publish/subscribe shape as a Redis channel if sessions ever need to
+span processes.
+"""
+import itertools
+import threading
+import weakref
+from collections import deque
+
+
+class Subscription:
+    """One session's view of a shared checklist"""
+
+    def __init__(self, bus, checklist_id):
+        self.bus = bus
+        self.checklist_id = checklist_id
+        self._inbox = deque()
+        # key -> sequence number of the newest change applied or published for it
+        self._seen = {}
+
+    def publish(self, changes, persist=None):
+        """Broadcast item changes to peers; ``persist`` is called with them in bus order"""
+        return self.bus.publish(self, changes, persist)
+
+    def drain(self):
+        """Return the key -> value changes pushed by peers since the last drain"""
+        changes = {}
+        while self._inbox:
+            seq, diff = self._inbox.popleft()
+            for key, value in diff.items():
+                if seq > self._seen.get(key, 0):
+                    self._seen[key] = seq
+                    changes[key] = value
+        return changes
+
+    def peers(self):
+        """Number of other sessions subscribed to the same checklist"""
+        return self.bus.subscribers(self.checklist_id) - 1
+
+
+class SyncBus:
+    """Routes item diffs between the subscriptions of each checklist"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        # Subscriptions live in each session's SessionManager record and drop out when it is
+        # spilled or its session ends
+        self._subscriptions = {}
+
+    def subscribe(self, checklist_id):
+        subscription = Subscription(self, checklist_id)
+        with self._lock:
+            self._subscriptions.setdefault(checklist_id, weakref.WeakSet()).add(subscription)
+        return subscription
+
+    def subscribers(self, checklist_id):
+        with self._lock:
+            return len(self._subscriptions.get(checklist_id, ()))
+
+    def publish(self, origin, changes, persist=None):
+        """Sequence ``changes`` from ``origin`` and deliver them to its peers
+
+        Persisting happens under the bus lock, so the store sees concurrent
+        changes in the same order the subscribers resolve them.
+        """
+        if not changes:
+            return None
+        changes = {key: bool(value) for key, value in changes.items()}
+        with self._lock:
+            seq = next(self._seq)
+            if persist is not None:
+                persist(changes)
+            for key in changes:
+                origin._seen[key] = seq
+            for subscription in list(self._subscriptions.get(origin.checklist_id, ())):
+                if subscription is not origin:
+                    subscription._inbox.append((seq, changes))
+        return seq
@@ -0,0 +1,595 @@
+"""Durable background delivery of landing-page leads to the n8n webhook.
+
+Every lead is written to an SQLite outbox (WAL mode) before anything is
+sent, so a webhook outage or a restart never loses one. A replayer thread
+picks due leads from the outbox and sends them on a bounded thread pool
+with the app's ``send`` function, passing the lead's id as an idempotency
+key so a retried lead can be deduplicated downstream.
+
+Failed sends are retried with exponential backoff and jitter, up to
+``max_attempts``. A successful send after failures pulls every waiting
+retry forward, so a backlog drains as soon as the webhook is back rather
+than when each lead's backoff runs out. Leads left "sending" by a crashed
+process are retried on start-up.
+
+With a ``send_batch`` function and ``batch_size`` > 1, due leads are
+coalesced until ``batch_size`` of them are waiting or the oldest has
+waited ``batch_wait`` seconds, then sent as one request with a result per
+lead. If the webhook turns out not to take batches, the dispatcher logs it
+and goes back to sending leads one at a time.
+
+An optional CircuitBreaker, shared by every session in the process, stops
+sends after repeated failures (network errors, timeouts, 5xx, 429) and
+probes the webhook with one lead at a time until it recovers. Leads
+submitted while it is open go straight into the outbox as retrying. Its
+read timeout follows the webhook's recent latency, so a degraded webhook
+fails in a few times its normal response time rather than the full
+timeout.
+
+The page polls ``status`` to show how delivery went. ``http_session`` and
+``post_json`` give senders a pooled keep-alive client with separate
+connect and read timeouts and optional gzip request bodies; ``post_batch``
+sends a batch over it.
+"""
+import gzip
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+SENDING = "sending"
+RETRYING = "retrying"
+DELIVERED = "delivered"
+FAILED = "failed"
+REJECTED = "rejected"
+PENDING_STATES = (QUEUED, SENDING)
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+# Answers to a batch that mean the webhook only takes one lead per request
+BATCH_UNSUPPORTED_STATUSES = frozenset({400, 404, 405, 413, 415, 422, 501})
+
+
+class BatchUnsupported(Exception):
+    """The webhook does not accept leads in batches"""
+
+
+@dataclass
+class Delivery:
+    """Status of one lead's delivery"""
+
+    id: str
+    status: str = QUEUED
+    attempts: int = 0
+    error: str = ""
+    submitted_at: float = None
+    finished_at: float = None
+
+    @property
+    def pending(self):
+        return self.status in PENDING_STATES
+
+
+def http_session(pool_size=8):
+    """A requests Session that keeps up to ``pool_size`` connections per host alive
+
+    Safe to share between worker threads. Retries are left to the outbox.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def post_json(session, url, payload, connect_timeout=3.05, read_timeout=10, compress=False, headers=None):
+    """POST ``payload`` as JSON, gzipping the body when ``compress`` is set"""
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    if compress:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return session.post(url, data=body, headers=headers, timeout=(connect_timeout, read_timeout))
+
+
+def post_batch(session, url, items, connect_timeout=3.05, read_timeout=10, compress=False, headers=None):
+    """POST ``(lead_id, payload)`` items as one JSON array and return ``(success, response)`` per item
+
+    Each lead carries its id as ``idempotency_key``. The webhook answers 200
+    or 207 with one result per lead: a JSON list, or ``{"results": [...]}``,
+    of ``{"id": ..., "ok": bool}`` objects (``"status": <HTTP code>`` also
+    works), or of booleans in request order. A lead it leaves out counts as
+    failed. Raises BatchUnsupported for a client error or an answer without
+    per-lead results; a server error fails the whole batch.
+    """
+    lead_ids = [lead_id for lead_id, _ in items]
+    body = [{**payload, "idempotency_key": lead_id} for lead_id, payload in items]
+    response = post_json(session, url, body, connect_timeout, read_timeout, compress,
+                         {"X-Lead-Batch": str(len(items)), **(headers or {})})
+    if response.status_code in BATCH_UNSUPPORTED_STATUSES:
+        raise BatchUnsupported(f"HTTP {response.status_code}")
+    if response.status_code not in (200, 207):
+        return [(False, response)] * len(items)
+    try:
+        results = response.json()
+    except ValueError:
+        raise BatchUnsupported("response is not JSON") from None
+    if isinstance(results, dict):
+        results = results.get("results")
+    if not isinstance(results, list):
+        raise BatchUnsupported("response has no per-lead results")
+    if results and all(isinstance(entry, dict) and ("id" in entry or "idempotency_key" in entry) for entry in results):
+        by_id = {str(entry.get("id", entry.get("idempotency_key"))): entry for entry in results}
+        entries = [by_id.get(lead_id) for lead_id in lead_ids]
+    elif len(results) == len(items):
+        entries = results
+    else:
+        raise BatchUnsupported(f"{len(results)} results for {len(items)} leads")
+    return [_batch_outcome(entry) for entry in entries]
+
+
+def _batch_outcome(entry):
+    if entry is None:
+        return False, "missing from the batch response"
+    if isinstance(entry, dict):
+        ok = entry["ok"] if "ok" in entry else 200 <= int(entry.get("status") or 0) < 300
+        return bool(ok), entry
+    return bool(entry), entry
+
+
+def endpoint_healthy(success, response):
+    """Whether a send's outcome says the webhook is up: anything but a network error, a 5xx or a 429"""
+    if success:
+        return True
+    status = getattr(response, "status_code", None)
+    return status is not None and status < 500 and status != 429
+
+
+class CircuitBreaker:
+    """Stops sends to a failing webhook and adapts the read timeout to its latency
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    no sends start for ``reset_timeout`` seconds. Then it goes half-open and
+    lets one probe through: success closes it, failure opens it again with
+    the wait doubled, up to ``max_reset_timeout``.
+
+    ``read_timeout()`` is ``multiplier`` times the ``percentile`` of recent
+    successful send latencies, clamped to [``min_timeout``, ``max_timeout``],
+    or ``max_timeout`` until ``min_samples`` sends have succeeded.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, max_reset_timeout=300.0, min_timeout=1.0,
+                 max_timeout=10.0, percentile=99, multiplier=3.0, window=200, min_samples=20):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = reset_timeout
+        self.opened_at = 0.0
+        self._probing = False
+
+    @property
+    def retry_at(self):
+        """When an open circuit lets the next probe through"""
+        return self.opened_at + self.reset_timeout
+
+    @property
+    def probing(self):
+        """Whether a half-open circuit is waiting on its probe, so no other send may start"""
+        return self.state == HALF_OPEN and self._probing
+
+    def acquire(self, wanted, now=None):
+        """How many of ``wanted`` sends may start now; a half-open circuit allows one probe at a time"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.state == CLOSED:
+                return wanted
+            if self.state == OPEN:
+                if now < self.retry_at:
+                    return 0
+                self.state = HALF_OPEN
+                self._probing = False
+            if self._probing or wanted < 1:
+                return 0
+            self._probing = True
+            return 1
+
+    def release(self):
+        """Give back a probe that was acquired but not sent"""
+        with self._lock:
+            self._probing = False
+
+    def record(self, healthy, latency, now=None):
+        """Count a finished send; ``latency`` only feeds the timeout when it was healthy"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if healthy:
+                self._latencies.append(latency)
+                self.failures = 0
+                if self.state == HALF_OPEN:
+                    self.state = CLOSED
+                    self._probing = False
+                    self.reset_timeout = self.base_reset_timeout
+                    logger.info("Webhook answers again; circuit closed")
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+                self._open(now)
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        self._probing = False
+        logger.warning("Webhook failing (%d in a row); circuit open for %.0fs", self.failures, self.reset_timeout)
+
+    def read_timeout(self):
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.max_timeout
+            ordered = sorted(self._latencies)
+        latency = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+        return min(self.max_timeout, max(self.min_timeout, latency * self.multiplier))
+
+
+class LeadOutbox:
+    """SQLite table of leads waiting for, or done with, delivery"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            next_attempt_at REAL NOT NULL,
+            finished_at REAL,
+            last_error TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Durable against process crashes; an OS crash may lose the last few commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def add(self, lead_id, payload, status=QUEUED, next_attempt_at=None, error=""):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (id, payload, status, created_at, next_attempt_at, last_error) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (lead_id, json.dumps(payload), status, now, now if next_attempt_at is None else next_attempt_at, error),
+            )
+
+    def get(self, lead_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, attempts, last_error, created_at, finished_at FROM outbox WHERE id = ?", (lead_id,)
+            ).fetchone()
+        return Delivery(*row) if row else None
+
+    def claim_due(self, now, limit):
+        """Mark up to ``limit`` due leads as sending and return their (id, payload, attempts)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, payload, attempts FROM outbox WHERE status IN (?, ?) AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at LIMIT ?",
+                    (QUEUED, RETRYING, now, limit),
+                ).fetchall()
+                self._conn.executemany("UPDATE outbox SET status = ? WHERE id = ?", [(SENDING, row[0]) for row in rows])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(lead_id, json.loads(payload), attempts) for lead_id, payload, attempts in rows]
+
+    def record(self, results):
+        """Apply (id, status, attempts, next_attempt_at, error) results in one transaction"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                    "finished_at = CASE WHEN ? IN (?, ?) THEN ? ELSE NULL END WHERE id = ?",
+                    [
+                        (status, attempts, next_at, error, status, DELIVERED, FAILED, now, lead_id)
+                        for lead_id, status, attempts, next_at, error in results
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def defer_queued(self, until):
+        """Turn leads still waiting for their first attempt into retries due at ``until``"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE outbox SET status = ?, next_attempt_at = MAX(next_attempt_at, ?) WHERE status = ?",
+                (RETRYING, until, QUEUED),
+            ).rowcount
+
+    def retry_now(self, now):
+        """Make every waiting retry due immediately"""
+        with self._lock:
+            self._conn.execute("UPDATE outbox SET next_attempt_at = ? WHERE status = ?", (now, RETRYING))
+
+    def recover(self, now):
+        """Requeue leads a previous process left mid-send"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, next_attempt_at = ? WHERE status = ?", (RETRYING, now, SENDING)
+            )
+
+    def next_due(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status IN (?, ?)", (QUEUED, RETRYING)
+            ).fetchone()
+        return row[0]
+
+    def backlog(self, now):
+        """(earliest next attempt, number of leads due at ``now``) over the waiting leads"""
+        with self._lock:
+            oldest, due = self._conn.execute(
+                "SELECT MIN(next_attempt_at), COUNT(CASE WHEN next_attempt_at <= ? THEN 1 END) FROM outbox "
+                "WHERE status IN (?, ?)",
+                (now, QUEUED, RETRYING),
+            ).fetchone()
+        return oldest, due
+
+    def purge(self, before):
+        """Delete delivered leads finished before the given time"""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM outbox WHERE status = ? AND finished_at < ?", (DELIVERED, before)
+            ).rowcount
+
+    def counts(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class WebhookDispatcher:
+    """Stores leads in the outbox and replays them with ``send(payload, idempotency_key) -> (success, response)``
+
+    ``send_batch([(idempotency_key, payload), ...])`` returns a ``(success,
+    response)`` per lead, or raises BatchUnsupported; it is only used when
+    ``batch_size`` > 1.
+
+    With a CircuitBreaker, sends stop while it is open; leads submitted
+    meanwhile are stored as retrying at once, due when the breaker next
+    lets a probe through, so visitors aren't kept waiting on a dead webhook.
+
+    Leads the outbox could not store never reach the table, so the last
+    ``rejected_limit`` of them are kept in memory for ``status``.
+    """
+
+    def __init__(self, send, outbox_path, workers=4, max_attempts=12, base_backoff=2.0, max_backoff=300.0,
+                 retention=7 * 86400, poll_interval=5.0, send_batch=None, batch_size=1, batch_wait=0.2,
+                 breaker=None, rejected_limit=1000):
+        self.send = send
+        self.breaker = breaker
+        self.send_batch = send_batch
+        self.batch_size = batch_size if send_batch else 1
+        self.batch_wait = batch_wait
+        self.outbox = LeadOutbox(outbox_path)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lead-delivery")
+        self._cond = threading.Condition()
+        self._results = []
+        self._inflight = 0
+        self._closed = False
+        self._rejected = OrderedDict()
+        self.rejected_limit = rejected_limit
+        self.outbox.recover(time.time())
+        self._replayer = threading.Thread(target=self._run, name="lead-replayer", daemon=True)
+        self._replayer.start()
+
+    def submit(self, payload):
+        """Store a lead durably and return its Delivery without waiting for the webhook"""
+        delivery = Delivery(id=uuid.uuid4().hex, submitted_at=time.time())
+        if self.breaker is not None and self.breaker.state == OPEN:
+            # Fallback while the webhook is down: keep the lead and send it once the circuit closes
+            delivery.status, delivery.error = RETRYING, "webhook unavailable"
+        try:
+            self.outbox.add(delivery.id, payload, delivery.status,
+                            self.breaker.retry_at if delivery.status == RETRYING else None, delivery.error)
+        except sqlite3.Error as e:
+            logger.exception("Could not store lead in the outbox")
+            delivery.status = REJECTED
+            delivery.error = str(e)
+            with self._cond:
+                self._rejected[delivery.id] = delivery
+                while len(self._rejected) > self.rejected_limit:
+                    self._rejected.popitem(last=False)
+            return delivery
+        with self._cond:
+            self._cond.notify_all()
+        return delivery
+
+    def status(self, delivery_id):
+        if not delivery_id:
+            return None
+        with self._cond:
+            rejected = self._rejected.get(delivery_id)
+        return rejected or self.outbox.get(delivery_id)
+
+    def stats(self):
+        return self.outbox.counts()
+
+    @property
+    def batching(self):
+        return self.batch_size > 1
+
+    def backoff(self, attempts):
+        """Seconds to wait before the next attempt, with jitter so retries don't arrive in lockstep"""
+        return min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            self._replayer.join()
+        self._executor.shutdown(wait=wait)
+
+    def _outcome(self, lead_id, attempts, success, response):
+        if success:
+            return (lead_id, DELIVERED, attempts, 0.0, "")
+        if attempts >= self.max_attempts:
+            return (lead_id, FAILED, attempts, 0.0, str(response))
+        return (lead_id, RETRYING, attempts, time.time() + self.backoff(attempts), str(response))
+
+    def _finish(self, results):
+        with self._cond:
+            self._results.extend(results)
+            self._inflight -= 1
+            self._cond.notify_all()
+
+    def _observe(self, started, healthy):
+        if self.breaker is not None:
+            self.breaker.record(healthy, time.perf_counter() - started)
+
+    def _deliver(self, lead_id, payload, attempts):
+        started = time.perf_counter()
+        try:
+            success, response = self.send(payload, lead_id)
+        except Exception as e:  # a failing send must not kill the worker
+            success, response = False, e
+        self._observe(started, endpoint_healthy(success, response))
+        self._finish([self._outcome(lead_id, attempts + 1, success, response)])
+
+    def _deliver_batch(self, leads):
+        started = time.perf_counter()
+        try:
+            outcomes = self.send_batch([(lead_id, payload) for lead_id, payload, _ in leads])
+        except BatchUnsupported as e:
+            if self.batching:
+                logger.warning("Webhook does not take batches (%s); sending leads one at a time", e)
+                self.batch_size = 1
+            # Not the leads' fault: make them due again without counting an attempt
+            now = time.time()
+            error = f"batch not accepted: {e}"
+            self._finish([(lead_id, RETRYING, attempts, now, error) for lead_id, _, attempts in leads])
+            return
+        except Exception as e:
+            outcomes = [(False, e)] * len(leads)
+        self._observe(started, any(success for success, _ in outcomes) or endpoint_healthy(*outcomes[0]))
+        self._finish([
+            self._outcome(lead_id, attempts + 1, success, response)
+            for (lead_id, _, attempts), (success, response) in zip(leads, outcomes)
+        ])
+
+    def _flush_at(self):
+        """When waiting leads should be claimed; while batching, once a batch fills or the oldest waited batch_wait"""
+        if not self.batching:
+            return self.outbox.next_due()
+        oldest, due = self.outbox.backlog(time.time())
+        if oldest is None or due >= self.batch_size:
+            return oldest
+        return oldest + self.batch_wait
+
+    def _claim(self, now, free):
+        """Hand due leads to the workers, as far as the circuit breaker allows"""
+        size = self.batch_size
+        limit = free * size
+        probe = False
+        if self.breaker is not None:
+            allowed = self.breaker.acquire(free, now)
+            if self.breaker.state == OPEN:
+                # Leads queued before the circuit opened would otherwise show as "sending" until it closes
+                self.outbox.defer_queued(self.breaker.retry_at)
+            probe = allowed > 0 and self.breaker.state == HALF_OPEN
+            # A half-open circuit is probed with a single lead
+            limit = 1 if probe else allowed * size
+        claimed = self.outbox.claim_due(now, limit) if limit else []
+        if probe and not claimed:
+            self.breaker.release()
+        for start in range(0, len(claimed), size):
+            leads = claimed[start:start + size]
+            with self._cond:
+                self._inflight += 1
+            if len(leads) == 1:
+                self._executor.submit(self._deliver, *leads[0])
+            else:
+                self._executor.submit(self._deliver_batch, leads)
+
+    def _run(self):
+        last_purge = 0.0
+        while True:
+            with self._cond:
+                if not self._results and not self._closed:
+                    if self._inflight >= self.workers or (self.breaker is not None and self.breaker.probing):
+                        # Every worker is busy, or the circuit waits on its probe; a finished send wakes us
+                        self._cond.wait(self.poll_interval)
+                    else:
+                        flush_at = self._flush_at()
+                        if flush_at is not None and self.breaker is not None and self.breaker.state == OPEN:
+                            flush_at = max(flush_at, self.breaker.retry_at)
+                        timeout = self.poll_interval if flush_at is None else flush_at - time.time()
+                        if timeout > 0:
+                            self._cond.wait(min(timeout, self.poll_interval))
+                results, self._results = self._results, []
+                free = self.workers - self._inflight
+                closed = self._closed
+            try:
+                if results:
+                    self.outbox.record(results)
+                    statuses = {status for _, status, *_ in results}
+                    if DELIVERED in statuses and RETRYING not in statuses:
+                        # The webhook answers again: stop waiting out the backoff of earlier failures
+                        self.outbox.retry_now(time.time())
+                if closed:
+                    return
+                now = time.time()
+                # A submit wakes us early; while batching, keep collecting until the batch is due
+                flush_at = self._flush_at() if self.batching else now
+                if free > 0 and flush_at is not None and flush_at <= now:
+                    self._claim(now, free)
+                if now - last_purge > 3600:
+                    last_purge = now
+                    self.outbox.purge(now - self.retention)
+            except sqlite3.Error:
+                logger.exception("Lead outbox error; retrying")
+                time.sleep(1)
@@ -0,0 +1,514 @@
+"""Lead validation and normalization shared by the landing page and bulk clean-ups.
+
+Emails are trimmed and lowercased and checked against a stricter pattern
+than the form used to apply. Phone numbers are normalized to E.164 using
+the lead's country: national formats ("0712 345 678" in Kenya, "(415)
+555-0123" in the United States) get the country's calling code and lose
+their trunk prefix, and the national number is checked against the
+country's length and leading-digit rules. Numbers written in
+international form are checked against the rules of the country their
+calling code belongs to, since leads often give a number from another
+country. For countries without rules (e.g. "Other") the number has to be
+international, with or without the "+", and of valid E.164 length.
+
+The rules are plausibility checks on the numbering plans, not a full
+numbering database, and every pattern is compiled once at import.
+
+The bulk API streams CSV or JSONL lead exports, so files of any size clean
+in constant memory. CSV files go through Arrow's compute kernels a few MB
+at a time (``normalize_emails`` / ``normalize_phones`` apply the same
+patterns, which are written to work in both Python's re and Arrow's RE2);
+JSONL leads, which nest the fields, are cleaned one at a time:
+
+    python lead_validation.py leads.csv clean.csv
+    python lead_validation.py leads.jsonl clean.jsonl --valid-only --rejects rejects.jsonl
+
+Each output row carries the normalized email and phone plus ``lead_valid``
+and ``lead_errors`` columns; a JSON summary goes to stderr.
+"""
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import operator
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # installed with Streamlit; without it CSV files are cleaned row by row
+    pa = None
+
+# Local part and domain; no leading, trailing or doubled dots. Written for both Python's re
+# and RE2 (Arrow's regex engine), so it has no lookarounds; the length limit is checked apart.
+EMAIL_PATTERN = (
+    r"[a-z0-9!#$%&'*+/=?^_`{|}~-]{1,64}(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r"@(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}"
+)
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+EMAIL_MAX_LENGTH = 254
+# Total digits in an E.164 number, country code included
+E164_PATTERN = r"[1-9]\d{6,14}"
+E164_RE = re.compile(E164_PATTERN)
+# Separators people type inside phone numbers
+PHONE_SEPARATORS = " \t\u00a0-.()/"
+_SEPARATOR_TABLE = str.maketrans("", "", PHONE_SEPARATORS)
+_SEPARATOR_CLASS = "[ \t\u00a0.()/-]"
+
+
+@dataclass(frozen=True)
+class PhoneRule:
+    """How a country's numbers look: calling code, national number pattern and trunk prefix
+
+    ``pattern`` matches the national significant number, i.e. without the
+    calling code and trunk prefix.
+    """
+
+    calling_code: str
+    pattern: str
+    trunk_prefix: str
+    national: re.Pattern
+
+
+def _rule(calling_code, pattern, trunk_prefix="0"):
+    return PhoneRule(calling_code, pattern, trunk_prefix, re.compile(pattern))
+
+
+# Keyed by the country names on the landing-page form. National patterns never start with
+# the trunk prefix, so stripping it can't turn one valid number into another.
+PHONE_RULES = {
+    "United States": _rule("1", r"[2-9]\d{2}[2-9]\d{6}", "1"),
+    "Canada": _rule("1", r"[2-9]\d{2}[2-9]\d{6}", "1"),
+    "United Kingdom": _rule("44", r"[1-9]\d{8,9}"),
+    "Nigeria": _rule("234", r"[789][01]\d{8}|[1-9]\d{7}"),
+    "Kenya": _rule("254", r"[17]\d{8}|[2-6]\d{7,8}"),
+    "Ghana": _rule("233", r"[235]\d{8}"),
+    "South Africa": _rule("27", r"[1-8]\d{8}"),
+    "Uganda": _rule("256", r"[2-7]\d{8}"),
+    "Tanzania": _rule("255", r"[2-7]\d{8}"),
+    "Rwanda": _rule("250", r"[27]\d{8}"),
+    "India": _rule("91", r"[1-9]\d{9}"),
+    "Philippines": _rule("63", r"[2-9]\d{7,9}"),
+    # The 1 that mobile numbers carried until 2019 is dropped like a trunk prefix
+    "Mexico": _rule("52", r"[2-9]\d{9}", "1"),
+    "Brazil": _rule("55", r"[1-9]{2}(?:9\d{8}|[2-5]\d{7})"),
+    "Colombia": _rule("57", r"3\d{9}|60\d{8}", ""),
+}
+# For numbers in international form; the United States stands in for the whole +1 plan
+RULES_BY_CODE = {}
+for _country, _phone_rule in PHONE_RULES.items():
+    RULES_BY_CODE.setdefault(_phone_rule.calling_code, _phone_rule)
+# Longest codes first, so e.g. +254 isn't mistaken for a shorter code
+CALLING_CODES = sorted(RULES_BY_CODE, key=len, reverse=True)
+_CODE_LENGTHS = sorted({len(code) for code in RULES_BY_CODE}, reverse=True)
+
+# Where fields live in a flat export row, or in the nested payload the form sends
+DEFAULT_FIELDS = {
+    "email": ("email", "personal_info.email"),
+    "phone": ("phone", "personal_info.phone"),
+    "country": ("country", "personal_info.country"),
+}
+
+
+def normalize_email(email):
+    """The trimmed, lowercased email, or None if it isn't a valid address"""
+    if email is None or email == "":
+        return None
+    # JSON leads can carry numbers or other types; they are checked as text
+    email = str(email).strip().lower()
+    if email.startswith("mailto:"):
+        email = email[7:]
+    return email if len(email) <= EMAIL_MAX_LENGTH and EMAIL_RE.fullmatch(email) else None
+
+
+def validate_email(email):
+    return normalize_email(email) is not None
+
+
+def _to_e164(rule, number):
+    """The E.164 form of a national number, with or without its trunk prefix, or None if the rule rejects it"""
+    if rule.national.fullmatch(number):
+        return "+" + rule.calling_code + number
+    trunk = rule.trunk_prefix
+    if trunk and number.startswith(trunk) and rule.national.fullmatch(number[len(trunk):]):
+        return "+" + rule.calling_code + number[len(trunk):]
+    return None
+
+
+def normalize_phone(phone, country=None):
+    """The number in E.164 form (``+254712345678``), or None if it isn't valid for ``country``"""
+    if phone is None or phone == "":
+        return None
+    # JSON exports often store numbers as numbers, e.g. "phone": 254712345678
+    digits = str(phone).translate(_SEPARATOR_TABLE)
+    if digits.startswith("+"):
+        digits = digits[1:]
+        international = True
+    elif digits.startswith("00"):
+        digits = digits[2:]
+        international = True
+    else:
+        international = False
+    if not digits.isdigit() or not digits.isascii():
+        return None
+
+    rule = PHONE_RULES.get(country) if isinstance(country, str) else None
+    if not international and rule is not None:
+        e164 = _to_e164(rule, digits)
+        if e164 is None and digits.startswith(rule.calling_code):
+            # Calling code typed without the "+"
+            e164 = _to_e164(rule, digits[len(rule.calling_code):])
+        return e164
+
+    if not E164_RE.fullmatch(digits):
+        return None
+    for length in _CODE_LENGTHS:
+        code_rule = RULES_BY_CODE.get(digits[:length])
+        if code_rule is not None:
+            # The trunk prefix is sometimes kept after the code, as in "+44 (0)20 ..."
+            return _to_e164(code_rule, digits[length:])
+    return "+" + digits
+
+
+def validate_phone(phone, country=None):
+    return normalize_phone(phone, country) is not None
+
+
+def phone_hint(country):
+    """How a number from ``country`` should be written, for error messages"""
+    rule = PHONE_RULES.get(country)
+    return f"for {country} (+{rule.calling_code})" if rule else "in international format (+country code)"
+
+
+def _as_strings(values):
+    """Cast non-text arrays (e.g. phone numbers read as integers) to strings, as str() does for one value"""
+    return values if pa.types.is_string(values.type) else pc.cast(values, pa.string())
+
+
+def _matches(values, pattern):
+    return pc.fill_null(pc.match_substring_regex(values, f"^(?:{pattern})$"), False)
+
+
+def normalize_emails(emails):
+    """normalize_email over an Arrow string array; null where invalid"""
+    emails = pc.utf8_lower(pc.utf8_trim_whitespace(pc.fill_null(_as_strings(emails), "")))
+    emails = pc.replace_substring_regex(emails, "^mailto:", "")
+    valid = pc.and_(_matches(emails, EMAIL_PATTERN), pc.less_equal(pc.utf8_length(emails), EMAIL_MAX_LENGTH))
+    return pc.if_else(valid, emails, pa.scalar(None, pa.string()))
+
+
+def _to_e164_array(rule, numbers):
+    """_to_e164 over an Arrow string array"""
+    prefix = pa.scalar("+" + rule.calling_code)
+    e164 = pc.if_else(_matches(numbers, rule.pattern), pc.binary_join_element_wise(prefix, numbers, ""),
+                      pa.scalar(None, pa.string()))
+    trunk = rule.trunk_prefix
+    if trunk:
+        rest = pc.utf8_slice_codeunits(numbers, len(trunk))
+        trunk_ok = pc.and_(pc.starts_with(numbers, trunk), _matches(rest, rule.pattern))
+        e164 = pc.if_else(pc.and_(pc.is_null(e164), trunk_ok), pc.binary_join_element_wise(prefix, rest, ""), e164)
+    return e164
+
+
+def normalize_phones(phones, countries):
+    """normalize_phone over Arrow string arrays of numbers and countries; null where invalid
+
+    Each rule's patterns only run on the rows they apply to (the numbers
+    from that country, or with that calling code).
+    """
+    countries = pc.fill_null(_as_strings(countries), "")
+    digits = pc.replace_substring_regex(pc.fill_null(_as_strings(phones), ""), _SEPARATOR_CLASS, "")
+    international = pc.or_(pc.starts_with(digits, "+"), pc.starts_with(digits, "00"))
+    digits = pc.replace_substring_regex(digits, r"^(?:\+|00)", "", max_replacements=1)
+    well_formed = _matches(digits, r"\d+")
+    e164 = pa.nulls(len(digits), pa.string())
+
+    national = pc.and_(well_formed, pc.invert(international))
+    for country, rule in PHONE_RULES.items():
+        rows = pc.and_(national, pc.equal(countries, country))
+        if not pc.any(rows).as_py():
+            continue
+        numbers = pc.filter(digits, rows)
+        found = _to_e164_array(rule, numbers)
+        # Calling code typed without the "+"
+        with_code = pc.and_(pc.is_null(found), pc.starts_with(numbers, rule.calling_code))
+        if pc.any(with_code).as_py():
+            without_code = _to_e164_array(rule, pc.utf8_slice_codeunits(numbers, len(rule.calling_code)))
+            found = pc.if_else(with_code, without_code, found)
+        e164 = pc.replace_with_mask(e164, rows, found)
+
+    known = pc.is_in(countries, value_set=pa.array(list(PHONE_RULES)))
+    remaining = pc.and_(pc.and_(well_formed, pc.or_(international, pc.invert(known))), _matches(digits, E164_PATTERN))
+    for code in CALLING_CODES:
+        rows = pc.and_(remaining, pc.starts_with(digits, code))
+        if not pc.any(rows).as_py():
+            continue
+        numbers = pc.utf8_slice_codeunits(pc.filter(digits, rows), len(code))
+        e164 = pc.replace_with_mask(e164, rows, _to_e164_array(RULES_BY_CODE[code], numbers))
+        remaining = pc.and_(remaining, pc.invert(rows))
+    return pc.if_else(remaining, pc.binary_join_element_wise(pa.scalar("+"), digits, ""), e164)
+
+
+def _get(row, keys):
+    for key in keys:
+        if not isinstance(row, dict) or key not in row:
+            return None
+        row = row[key]
+    return row
+
+
+def _accessors(path):
+    """(get, set) functions for a column name or dotted path in dict rows"""
+    *parents, last = path.split(".")
+    if not parents:
+        return (lambda row: row.get(last)), (lambda row, value: row.__setitem__(last, value))
+    keys = path.split(".")
+
+    def set_value(row, value):
+        for key in parents:
+            row = row[key]
+        row[last] = value
+
+    return (lambda row: _get(row, keys)), set_value
+
+
+def resolve_fields(row, fields=None):
+    """Map email/phone/country to the path each has in ``row`` (the first default path present)"""
+    resolved = {}
+    for name, paths in DEFAULT_FIELDS.items():
+        if fields and fields.get(name):
+            resolved[name] = fields[name]
+        else:
+            resolved[name] = next((path for path in paths if _get(row, path.split(".")) is not None), paths[0])
+    return resolved
+
+
+# Indexed by (email invalid) + 2 * (phone invalid)
+_ERRORS = ((), ("email",), ("phone",), ("email", "phone"))
+
+
+def _clean(rows, get_email, set_email, get_phone, set_phone, get_country):
+    for row in rows:
+        email = normalize_email(get_email(row))
+        phone = normalize_phone(get_phone(row), get_country(row))
+        if email is not None:
+            set_email(row, email)
+        if phone is not None:
+            set_phone(row, phone)
+        yield row, _ERRORS[(email is None) + 2 * (phone is None)]
+
+
+def clean_leads(rows, fields=None):
+    """Normalize email and phone in each lead dict in place, yielding ``(row, errors)``
+
+    ``errors`` is a tuple of the invalid fields ("email", "phone"). Field
+    paths are resolved from the first row unless given in ``fields``;
+    dotted paths reach into nested JSON leads.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    paths = resolve_fields(first, fields)
+    get_email, set_email = _accessors(paths["email"])
+    get_phone, set_phone = _accessors(paths["phone"])
+    get_country, _ = _accessors(paths["country"])
+    yield from _clean(itertools.chain((first,), rows), get_email, set_email, get_phone, set_phone, get_country)
+
+
+def validate_lead(lead, fields=None):
+    """Normalize one lead in place and return the tuple of invalid fields"""
+    return next(clean_leads([lead], fields))[1]
+
+
+def _csv_columns(header, fields):
+    """Index in ``header`` of the email, phone and country columns"""
+    columns = {}
+    for name, paths in DEFAULT_FIELDS.items():
+        column = (fields or {}).get(name) or paths[0]
+        if column not in header:
+            raise ValueError(f"no {column!r} column")
+        columns[name] = header.index(column)
+    return columns
+
+
+def _read_header(src):
+    with open(src, encoding="utf-8-sig", newline="") as fin:
+        return next(csv.reader(fin), None)
+
+
+def _clean_csv_batches(src, dst, fields, valid_only, rejects, counts):
+    """Clean a CSV file a block at a time with Arrow compute kernels"""
+    header = _read_header(src)
+    if header is None:
+        open(dst, "w").close()
+        return
+    columns = _csv_columns(header, fields)
+    reader = pa_csv.open_csv(
+        src,
+        read_options=pa_csv.ReadOptions(block_size=4 << 20),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        # Everything stays text: "007" must not become 7
+        convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in header}),
+    )
+    names = header + ["lead_valid", "lead_errors"]
+    schema = pa.schema([(name, pa.string()) for name in names])
+    options = pa_csv.WriteOptions(quoting_style="needed")
+    with contextlib.ExitStack() as files:
+        out = files.enter_context(pa_csv.CSVWriter(dst, schema, write_options=options))
+        bad = files.enter_context(pa_csv.CSVWriter(rejects, schema, write_options=options)) if rejects else None
+        for batch in reader:
+            arrays = list(batch.columns)
+            emails = normalize_emails(arrays[columns["email"]])
+            phones = normalize_phones(arrays[columns["phone"]], arrays[columns["country"]])
+            bad_email, bad_phone = pc.is_null(emails), pc.is_null(phones)
+            valid = pc.invert(pc.or_(bad_email, bad_phone))
+            arrays[columns["email"]] = pc.coalesce(emails, arrays[columns["email"]])
+            arrays[columns["phone"]] = pc.coalesce(phones, arrays[columns["phone"]])
+            arrays.append(pc.if_else(valid, "True", "False"))
+            arrays.append(pc.if_else(bad_email, pc.if_else(bad_phone, "email;phone", "email"),
+                                     pc.if_else(bad_phone, "phone", "")))
+            cleaned = pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+            n_valid = pc.sum(valid).as_py() or 0
+            counts["rows"] += len(cleaned)
+            counts["valid"] += n_valid
+            counts["invalid"] += len(cleaned) - n_valid
+            counts["email"] += pc.sum(bad_email).as_py() or 0
+            counts["phone"] += pc.sum(bad_phone).as_py() or 0
+            if bad is not None:
+                bad.write_batch(cleaned.filter(pc.invert(valid)))
+            out.write_batch(cleaned.filter(valid) if valid_only else cleaned)
+
+
+def _clean_csv_rows(fin, fields):
+    """Yield the header, then ``(row, errors)`` for each row, working on lists rather than dicts"""
+    reader = csv.reader(fin)
+    header = next(reader, None)
+    if header is None:
+        return
+    yield header + ["lead_valid", "lead_errors"]
+    columns = _csv_columns(header, fields)
+    width = len(header)
+
+    def padded(rows):
+        for row in rows:
+            if len(row) < width:
+                row += [""] * (width - len(row))
+            yield row
+
+    get_email, get_phone, get_country = (operator.itemgetter(columns[name]) for name in ("email", "phone", "country"))
+    set_email = lambda row, value: row.__setitem__(columns["email"], value)  # noqa: E731
+    set_phone = lambda row, value: row.__setitem__(columns["phone"], value)  # noqa: E731
+    yield from _clean(padded(reader), get_email, set_email, get_phone, set_phone, get_country)
+
+
+def _clean_rows(src, dst, fmt, fields, valid_only, rejects, counts):
+    """Clean a JSONL file, or a CSV file without Arrow, one row at a time"""
+    newline = "" if fmt == "csv" else None
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+    with contextlib.ExitStack() as files:
+        fin = files.enter_context(open(src, encoding=encoding, newline=newline))
+        fout = files.enter_context(open(dst, "w", encoding="utf-8", newline=newline))
+        fbad = files.enter_context(open(rejects, "w", encoding="utf-8", newline=newline)) if rejects else None
+        if fmt == "csv":
+            out = csv.writer(fout, lineterminator="\n", quoting=csv.QUOTE_ALL).writerow
+            bad = fbad and csv.writer(fbad, lineterminator="\n", quoting=csv.QUOTE_ALL).writerow
+            cleaned = _clean_csv_rows(fin, fields)
+            header = next(cleaned, None)
+            if header is not None:
+                out(header)
+                if bad:
+                    bad(header)
+
+            def flag(row, errors):
+                row += (str(not errors), ";".join(errors))
+        else:
+            encode = json.JSONEncoder(ensure_ascii=False).encode
+            out = lambda row: fout.write(encode(row) + "\n")  # noqa: E731
+            bad = fbad and (lambda row: fbad.write(encode(row) + "\n"))
+            cleaned = clean_leads((json.loads(line) for line in fin if line.strip()), fields)
+
+            def flag(row, errors):
+                row["lead_valid"] = not errors
+                row["lead_errors"] = ";".join(errors)
+
+        for row, errors in cleaned:
+            counts["rows"] += 1
+            flag(row, errors)
+            if errors:
+                counts["invalid"] += 1
+                for error in errors:
+                    counts[error] += 1
+                if bad:
+                    bad(row)
+                if valid_only:
+                    continue
+            else:
+                counts["valid"] += 1
+            out(row)
+
+
+def _format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def clean_file(src, dst, fmt=None, fields=None, valid_only=False, rejects=None, vectorized=True):
+    """Stream a CSV or JSONL lead export from ``src`` to ``dst`` with normalized values
+
+    Invalid rows are kept (flagged), dropped with ``valid_only``, and also
+    written to ``rejects`` if given. CSV files are processed in blocks with
+    Arrow when it is available (``vectorized``), unless they have ragged
+    rows; JSONL files and the rest one row at a time.
+    Returns summary counts.
+    """
+    fmt = _format(src, fmt)
+    counts = {"rows": 0, "valid": 0, "invalid": 0, "email": 0, "phone": 0}
+    started = time.perf_counter()
+    if fmt == "csv" and vectorized and pa is not None:
+        try:
+            _clean_csv_batches(src, dst, fields, valid_only, rejects, counts)
+        except pa.ArrowInvalid:
+            # Ragged rows; the row-by-row reader pads them. Start over.
+            counts.update(dict.fromkeys(counts, 0))
+            _clean_rows(src, dst, fmt, fields, valid_only, rejects, counts)
+    else:
+        _clean_rows(src, dst, fmt, fields, valid_only, rejects, counts)
+    elapsed = time.perf_counter() - started
+    counts["seconds"] = round(elapsed, 3)
+    counts["rows_per_s"] = round(counts["rows"] / elapsed) if elapsed else None
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("src", help="CSV or JSONL lead export")
+    parser.add_argument("dst", help="Where to write the cleaned rows, in the same format")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="Default: from the file extension")
+    parser.add_argument("--valid-only", action="store_true", help="Leave invalid rows out of dst")
+    parser.add_argument("--rejects", help="Also write invalid rows to this file")
+    parser.add_argument("--row-by-row", action="store_true", help="Don't use Arrow for CSV files")
+    for name in DEFAULT_FIELDS:
+        parser.add_argument(f"--{name}-field", dest=name, help=f"Column or dotted JSON path of the {name}")
+    args = parser.parse_args(argv)
+    fields = {name: getattr(args, name) for name in DEFAULT_FIELDS}
+    try:
+        summary = clean_file(args.src, args.dst, args.format, fields, args.valid_only, args.rejects,
+                             vectorized=not args.row_by_row)
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"Cannot clean {args.src}: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps({"file": os.path.basename(args.src), **summary}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())